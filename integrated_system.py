@@ -1,15 +1,30 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import pandas as pd
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import matplotlib.font_manager as fm
 import os
+import io
+import base64
+import sys
+import argparse
 import tempfile
+import shutil
+import time
+import queue
+import threading
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
+from statistics import NormalDist
 from datetime import datetime
 import seaborn as sns
-import random
 
 
 # 设置中文字体支持
@@ -65,11 +80,652 @@ SUBJECTS = [
     {"name": "时事政治", "min": 0, "max": 100, "pass_score": 60, "pass_rate": 60}
 ]
 
+
+# 命令行批量生成数据时每块的学生人数
+DEFAULT_CHUNK_SIZE = 1_000_000
+# 导入数据时每次读取的行数
+IMPORT_CHUNK_SIZE = 100_000
+# 数据行数达到该值且有多个CPU核心时，统计分析在进程池中并行计算
+PARALLEL_ANALYSIS_ROWS = 1_000_000
+# 数据行数超过该值时，散点图矩阵改为画二维直方图（密度），绘图时间与行数无关
+SCATTER_MATRIX_ROWS = 20_000
+# 同时保留的分析图表上限：图表数量和估计内存（字节），超过时释放最久未显示的图表
+MAX_LIVE_FIGURES = 12
+MAX_FIGURE_MEMORY = 256 * 1024 * 1024
+# 图表渲染缓存（PNG）所在目录（当前用户的缓存目录）和占用磁盘空间上限（字节）
+CHART_CACHE_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), 
+    "student-analysis", "charts")
+CHART_CACHE_BYTES = 256 * 1024 * 1024
+# 图表渲染缓存的版本：作图方式变化而程序文件内容之外的因素需要使旧缓存失效时加一
+CHART_CACHE_VERSION = 1
+
+# 姓氏与名字的全部组合，生成姓名时只需一次批量索引
+NAME_TABLE = [family + given for family in FAMILY_NAMES for given in GIVEN_NAMES]
+# 学号后四位 "0000"~"9999" 查找表
+ID_SUFFIX_TABLE = np.char.zfill(np.arange(10000).astype(str), 4)
+
+
+def smallest_int_dtype(low, high):
+    """返回能容纳 [low, high] 的最小有符号整数类型"""
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def memory_usage_bytes(data):
+    """DataFrame 占用的内存字节数（包括字符串对象本身）"""
+    return int(data.memory_usage(index=True, deep=True).sum())
+
+
+def compact_dtypes(data, category_ratio=0.5):
+    """压缩 DataFrame 的列类型，返回 (压缩后的DataFrame, 节省的字节数)
+
+    整数列降为能容纳取值范围的最小整数类型；浮点列在全为整数且无缺失值时同样降为整数，
+    否则降为 float32；班级以及重复值较多（不同取值占比不超过 category_ratio）的文本列转为分类类型。
+    """
+    before = memory_usage_bytes(data)
+    compacted = {}
+    for column in data.columns:
+        series = data[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series):
+            compacted[column] = series
+        elif pd.api.types.is_integer_dtype(series):
+            if len(series):
+                series = series.astype(smallest_int_dtype(int(series.min()), int(series.max())))
+            compacted[column] = series
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy()
+            if len(values) and not np.isnan(values).any() and np.array_equal(values, np.floor(values)) \
+                    and np.abs(values).max() < 2 ** 62:
+                compacted[column] = series.astype(smallest_int_dtype(int(values.min()), int(values.max())))
+            else:
+                compacted[column] = series.astype(np.float32)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if column == "班级" or series.nunique(dropna=True) <= category_ratio * len(series):
+                compacted[column] = series.astype("category")
+            else:
+                compacted[column] = series
+        else:
+            compacted[column] = series
+    result = pd.DataFrame(compacted, index=data.index)
+    return result, before - memory_usage_bytes(result)
+
+
+def format_memory_report(data, saved):
+    """生成内存占用说明文字"""
+    return f"数据内存占用 {memory_usage_bytes(data) / 2**20:.1f} MB（类型压缩节省 {saved / 2**20:.1f} MB）"
+
+
+def build_correlation_matrix(correlation, size):
+    """由统一相关系数或完整矩阵构建并校验 size×size 的相关系数矩阵"""
+    if np.isscalar(correlation):
+        matrix = np.full((size, size), float(correlation))
+        np.fill_diagonal(matrix, 1.0)
+    else:
+        matrix = np.asarray(correlation, dtype=float)
+    
+    if matrix.shape != (size, size):
+        raise ValueError(f"相关系数矩阵应为 {size}×{size}，实际为 {'×'.join(map(str, matrix.shape))}")
+    if not np.allclose(matrix, matrix.T):
+        raise ValueError("相关系数矩阵必须对称")
+    if not np.allclose(np.diag(matrix), 1.0):
+        raise ValueError("相关系数矩阵的对角线必须为1")
+    if np.abs(matrix).max() > 1:
+        raise ValueError("相关系数必须在 -1 到 1 之间")
+    return matrix
+
+
+class StudentDataEngine:
+    """学生数据生成引擎（基于 NumPy 批量生成，不依赖界面）"""
+    def __init__(self, subjects, id_prefix="2023", class_range="随机分配", seed=None, correlation=None):
+        # subjects 中每一项与 SUBJECTS 的结构相同
+        self.subjects = [dict(subject) for subject in subjects]
+        self.id_prefix = id_prefix
+        self.class_range = class_range
+        # correlation 为 None 时各科目独立生成；否则为统一的相关系数或按科目顺序排列的相关系数矩阵，
+        # 所有科目从多元正态分布中一次性联合抽样
+        self.correlation_matrix = None
+        self.correlation_factor = None
+        if correlation is not None:
+            self.correlation_matrix = build_correlation_matrix(correlation, len(self.subjects))
+            try:
+                self.correlation_factor = np.linalg.cholesky(self.correlation_matrix).astype(np.float32)
+            except np.linalg.LinAlgError:
+                raise ValueError("相关系数矩阵必须是正定矩阵")
+        # 每个数据块的随机数生成器都由主种子派生，相同种子、相同分块得到完全相同的数据
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.rng = self.chunk_rng(0)
+
+    def chunk_rng(self, chunk_index):
+        """返回第 chunk_index 个数据块专用的随机数生成器"""
+        return np.random.default_rng(
+            np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=(chunk_index,)))
+
+    @property
+    def columns(self):
+        """生成数据的列名"""
+        return ["序号", "学号", "姓名", "班级"] + [subject["name"] for subject in self.subjects]
+
+    def generate_names(self, count):
+        """批量随机生成姓名（以分类编码的形式直接构建）"""
+        codes = self.rng.integers(0, len(NAME_TABLE), size=count)
+        return pd.Categorical.from_codes(codes, categories=NAME_TABLE)
+
+    def generate_ids(self, start, count):
+        """批量生成学号，序号部分至少4位"""
+        # 序号拆为万位以上和后四位两段，各自查表后拼接，避免逐个格式化
+        high, low = np.divmod(np.arange(start + 1, start + count + 1), 10000)
+        first = start // 10000
+        heads = np.array([f"{self.id_prefix}{h or ''}" for h in range(first, (start + count) // 10000 + 1)])
+        return np.char.add(heads[high - first], ID_SUFFIX_TABLE[low])
+
+    def generate_classes(self, count):
+        """批量生成班级"""
+        if self.class_range == "随机分配":
+            codes = self.rng.integers(0, len(CLASSES), size=count)
+            return pd.Categorical.from_codes(codes, categories=CLASSES)
+        return pd.Categorical.from_codes(np.zeros(count, dtype=np.int8), categories=[self.class_range])
+
+    def min_pass_count(self, subject, count, start=0):
+        """计算本批学生中最少需要的及格人数
+
+        start 为本批第一名学生的序号偏移，分块生成时各块的保底及格人数之和等于整体的保底及格人数
+        """
+        pass_rate = subject["pass_rate"] / 100
+        min_pass_count = min(int(pass_rate * (start + count)) - int(pass_rate * start), count)
+        # 如果计算结果为0但及格率大于0，至少保证1个及格成绩
+        if min_pass_count == 0 and pass_rate > 0 and count > 0 and start == 0:
+            min_pass_count = 1
+        return min_pass_count
+
+    def score_range(self, subject):
+        """返回科目的 (最小值, 最大值)，确保参数有效"""
+        min_val, max_val = subject["min"], subject["max"]
+        if min_val > max_val:
+            min_val, max_val = max_val, min_val
+        return min_val, max_val
+
+    def generate_scores(self, subject, count, start=0):
+        """为特定科目批量生成所有学生的成绩，确保及格率不低于设定值"""
+        min_val, max_val = self.score_range(subject)
+        pass_score = subject["pass_score"]
+        min_pass_count = self.min_pass_count(subject, count, start)
+
+        # 保底的及格成绩之外，其余成绩以50%概率及格，据此得到每个学生的及格概率
+        pass_prob = (min_pass_count + 0.5 * (count - min_pass_count)) / max(count, 1)
+        pass_span = max_val - pass_score + 1
+        fail_span = max(pass_score - min_val, 1)
+
+        # 每个学生只抽取一个均匀随机数：落在 [0, p) 内为及格，
+        # 再按其在所属区间内的相对位置映射为及格或不及格分数段中的具体分数
+        draws = self.rng.random(count)
+        passed = draws < pass_prob
+        offsets = np.where(passed,
+                           draws / pass_prob * pass_span,
+                           (draws - pass_prob) / max(1 - pass_prob, 1e-12) * fail_span)
+        scores = np.where(passed, pass_score, min_val) + offsets.astype(np.int64)
+        scores = np.clip(scores, min_val, max_val).astype(smallest_int_dtype(min_val, max_val))
+
+        # 及格人数不足保底数量时，把部分不及格成绩改为及格成绩（各位置独立同分布，取前若干个即为随机选择）
+        shortfall = min_pass_count - int(passed.sum())
+        if shortfall > 0:
+            failed = np.flatnonzero(~passed)[:shortfall]
+            scores[failed] = self.rng.integers(pass_score, max_val, size=len(failed), endpoint=True)
+        return scores
+
+    def generate_correlated_scores(self, count, start=0):
+        """从多元正态分布中联合抽取所有科目的成绩，返回 {科目名: 成绩数组}
+
+        每批只做一次矩阵乘法：标准正态样本乘以相关系数矩阵的 Cholesky 因子得到相关的潜变量，
+        再按各科目的分数范围线性映射、取整并截断。若某科目及格人数低于保底数量，
+        则整体平移该科目的潜变量，使排在保底名次上的学生恰好及格，各科目间的排序关系保持不变。
+        """
+        latent = self.rng.standard_normal((count, len(self.subjects)), dtype=np.float32)
+        latent = latent @ self.correlation_factor.T
+        
+        scores = {}
+        for column, subject in enumerate(self.subjects):
+            min_val, max_val = self.score_range(subject)
+            pass_score = subject["pass_score"]
+            min_pass_count = self.min_pass_count(subject, count, start)
+            
+            # 与独立模式期望的及格率一致：保底及格之外的学生约一半及格
+            pass_prob = (min_pass_count + 0.5 * (count - min_pass_count)) / max(count, 1)
+            pass_prob = min(max(pass_prob, 1e-6), 1 - 1e-6)
+            std = subject.get("std", (max_val - min_val) / 6) or 1.0
+            mean = subject.get("mean", pass_score - 0.5 + std * NormalDist().inv_cdf(pass_prob))
+            raw = mean + std * latent[:, column]
+            
+            if min_pass_count > 0:
+                threshold = np.partition(raw, count - min_pass_count)[count - min_pass_count]
+                if np.floor(threshold + 0.5) < pass_score:
+                    raw += pass_score - threshold
+            
+            subject_scores = np.clip(np.floor(raw + 0.5), min_val, max_val)
+            scores[subject["name"]] = subject_scores.astype(smallest_int_dtype(min_val, max_val))
+        return scores
+
+    def generate_frame(self, count, start=0, chunk_index=0):
+        """生成 count 名学生的数据，start 为第一名学生的序号偏移"""
+        self.rng = self.chunk_rng(chunk_index)
+        data = {
+            "序号": np.arange(start + 1, start + count + 1),
+            "学号": self.generate_ids(start, count),
+            "姓名": self.generate_names(count),
+            "班级": self.generate_classes(count),
+        }
+        if self.correlation_factor is not None:
+            data.update(self.generate_correlated_scores(count, start))
+        else:
+            for subject in self.subjects:
+                data[subject["name"]] = self.generate_scores(subject, count, start)
+        return pd.DataFrame(data, columns=self.columns)
+
+    def chunk_count(self, total, chunk_size=DEFAULT_CHUNK_SIZE):
+        """total 名学生按 chunk_size 分块后的块数"""
+        return (total + chunk_size - 1) // chunk_size
+
+    def generate_chunk(self, total, chunk_size, chunk_index):
+        """生成第 chunk_index 块数据，块的位置与种子只取决于块号"""
+        start = chunk_index * chunk_size
+        return self.generate_frame(min(chunk_size, total - start), start, chunk_index)
+
+    def iter_frames(self, total, chunk_size=DEFAULT_CHUNK_SIZE):
+        """按固定大小分块依次生成 total 名学生的数据"""
+        for chunk_index in range(self.chunk_count(total, chunk_size)):
+            yield self.generate_chunk(total, chunk_size, chunk_index)
+
+    def generate_dataset(self, total, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+        """生成全部数据并合并为一个DataFrame，workers 大于1时各块在进程池中并行生成"""
+        chunk_indexes = range(self.chunk_count(total, chunk_size))
+        if workers > 1 and len(chunk_indexes) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                frames = list(executor.map(generate_chunk_task, repeat(self), repeat(total),
+                                           repeat(chunk_size), chunk_indexes))
+        else:
+            frames = [self.generate_chunk(total, chunk_size, index) for index in chunk_indexes]
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+
+def generate_chunk_task(engine, total, chunk_size, chunk_index):
+    """进程池任务：生成一个数据块"""
+    return engine.generate_chunk(total, chunk_size, chunk_index)
+
+
+def write_shard_task(engine, total, chunk_size, chunk_index, shard_path, file_format):
+    """进程池任务：生成一个数据块并写入分片文件，返回写入的行数"""
+    frame = engine.generate_chunk(total, chunk_size, chunk_index)
+    if file_format == "csv":
+        # 分片不带表头和 BOM，合并时直接按字节拼接
+        frame.to_csv(shard_path, index=False, header=False, encoding="utf-8", lineterminator="\n")
+    else:
+        pa, pq = import_pyarrow()
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), shard_path)
+    return len(frame)
+
+
+def import_pyarrow():
+    """导入可选依赖 pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("读写Parquet文件需要安装 pyarrow")
+    return pa, pq
+
+
+def detect_file_format(file_path, file_format=None):
+    """根据显式指定的格式或文件扩展名确定数据文件格式"""
+    if file_format:
+        return file_format
+    return "parquet" if file_path.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def write_dataset(engine, total, file_path, chunk_size=DEFAULT_CHUNK_SIZE, file_format=None, progress=None,
+                  workers=1):
+    """分块生成数据并流式写入 CSV/Parquet 文件，内存占用只与块大小有关
+
+    workers 大于1时各块在进程池中并行生成并写入分片：CSV 分片最后按字节拼接为一个文件，
+    Parquet 则以目录形式输出（每块一个 part-xxxxx.parquet 文件）。输出内容与进程数无关。
+    """
+    file_format = detect_file_format(file_path, file_format)
+    if file_format not in ("csv", "parquet"):
+        raise ValueError(f"不支持的文件格式: {file_format}")
+    if workers > 1:
+        return write_dataset_parallel(engine, total, file_path, chunk_size, file_format, progress, workers)
+    
+    written = 0
+    if file_format == "csv":
+        # 统一使用 utf-8-sig 和 "\n" 换行，与界面导出的 CSV 保持一致且输出与平台无关
+        with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
+            for frame in engine.iter_frames(total, chunk_size):
+                frame.to_csv(f, index=False, header=(written == 0), lineterminator="\n")
+                written += len(frame)
+                if progress:
+                    progress(written, total)
+    else:
+        pa, pq = import_pyarrow()
+        writer = None
+        try:
+            for frame in engine.iter_frames(total, chunk_size):
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(file_path, table.schema)
+                writer.write_table(table)
+                written += len(frame)
+                if progress:
+                    progress(written, total)
+        finally:
+            if writer is not None:
+                writer.close()
+    return written
+
+
+def write_dataset_parallel(engine, total, file_path, chunk_size, file_format, progress, workers):
+    """多进程分片生成数据，见 write_dataset"""
+    chunk_indexes = range(engine.chunk_count(total, chunk_size))
+    if file_format == "parquet":
+        os.makedirs(file_path, exist_ok=True)
+        shard_dir = file_path
+    else:
+        shard_dir = tempfile.mkdtemp(prefix=".shards_", dir=os.path.dirname(os.path.abspath(file_path)))
+    shard_paths = [os.path.join(shard_dir, f"part-{index:05d}.{file_format}") for index in chunk_indexes]
+    
+    written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for rows in executor.map(write_shard_task, repeat(engine), repeat(total), repeat(chunk_size),
+                                     chunk_indexes, shard_paths, repeat(file_format)):
+                written += rows
+                if progress:
+                    progress(written, total)
+        
+        if file_format == "csv":
+            # 先写入与串行模式相同的 BOM 和表头，再按块号顺序拼接分片字节
+            header = pd.DataFrame(columns=engine.columns).to_csv(index=False, lineterminator="\n")
+            with open(file_path, "wb") as output:
+                output.write(header.encode("utf-8-sig"))
+                for shard_path in shard_paths:
+                    with open(shard_path, "rb") as shard:
+                        shutil.copyfileobj(shard, output)
+    finally:
+        if file_format == "csv":
+            shutil.rmtree(shard_dir, ignore_errors=True)
+    return written
+
+
+class TableIndex:
+    """表格的排序与筛选索引
+
+    每列的排序结果（argsort）和最近使用的 MAX_MASKS 个筛选条件的布尔掩码在首次使用时计算并缓存，
+    数据不变时重复排序、切换筛选条件都只需组合已缓存的数组。数据变化时应重新创建索引。
+    """
+    MAX_MASKS = 8  # 筛选栏每输入一个新值就产生一个掩码，只保留最近使用的几个
+    
+    def __init__(self, data):
+        self.data = data
+        self.sort_orders = {}
+        self.masks = {}
+    
+    def sort_order(self, column, ascending=True):
+        """返回按 column 排序后的行位置数组，缺失值始终排在最后"""
+        if column not in self.sort_orders:
+            series = self.data[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # 按类别的取值而不是类别编码排序
+                category_rank = np.argsort(np.argsort(series.cat.categories.to_numpy()))
+                codes = series.cat.codes.to_numpy()
+                keys = pd.Series(np.where(codes >= 0, category_rank[codes], np.nan))
+            else:
+                keys = series.reset_index(drop=True)
+            order = np.asarray(keys.sort_values(kind="stable", na_position="last").index)
+            self.sort_orders[column] = (order, int(keys.notna().sum()))
+        
+        order, valid_count = self.sort_orders[column]
+        if ascending:
+            return order
+        return np.concatenate([order[:valid_count][::-1], order[valid_count:]])
+    
+    def mask(self, kind, column, *args):
+        """返回筛选条件的布尔掩码
+
+        kind 为 "equals"（等于 args[0]）、"range"（在 [args[0], args[1]] 之间，None 表示不限）
+        或 "prefix"（文本以 args[0] 开头）
+        """
+        key = (kind, column) + args
+        if key in self.masks:
+            # 移到最近使用的位置
+            self.masks[key] = self.masks.pop(key)
+        else:
+            series = self.data[column]
+            if kind == "equals":
+                mask = series == args[0]
+            elif kind == "range":
+                low, high = args
+                mask = pd.Series(True, index=series.index)
+                if low is not None:
+                    mask &= series >= low
+                if high is not None:
+                    mask &= series <= high
+            elif kind == "prefix":
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    # 只对类别取值做一次字符串匹配，再按编码展开到每一行
+                    matched = np.asarray(series.cat.categories.astype(str).str.startswith(args[0]))
+                    codes = series.cat.codes.to_numpy()
+                    mask = pd.Series(np.where(codes >= 0, matched[codes], False))
+                else:
+                    mask = series.astype(str).str.startswith(args[0])
+            else:
+                raise ValueError(f"未知的筛选条件: {kind}")
+            self.masks[key] = np.asarray(mask.fillna(False), dtype=bool)
+            while len(self.masks) > self.MAX_MASKS:
+                del self.masks[next(iter(self.masks))]
+        return self.masks[key]
+    
+    def row_order(self, sort_column=None, ascending=True, filters=()):
+        """组合排序和筛选条件，返回要显示的行位置数组；不排序也不筛选时返回 None"""
+        mask = None
+        for condition in filters:
+            condition_mask = self.mask(*condition)
+            mask = condition_mask if mask is None else mask & condition_mask
+        
+        if sort_column is None:
+            return None if mask is None else np.flatnonzero(mask)
+        order = self.sort_order(sort_column, ascending)
+        return order if mask is None else order[mask[order]]
+
+
+class VirtualTable(ttk.Frame):
+    """虚拟化数据表格
+
+    Treeview 中只保留可见区域所需数量的行，滚动时从 DataFrame 中按位置取出当前窗口的数据
+    填入这些行，显示开销只与窗口高度有关，与数据总行数无关。
+    """
+    DEFAULT_ROW_HEIGHT = 20
+    HEADING_HEIGHT = 25
+    
+    def __init__(self, parent, sortable=True, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.data = None
+        self.first_row = 0
+        self.visible_rows = 1
+        
+        # 排序与筛选状态，点击列标题切换排序
+        self.sortable = sortable
+        self.index = None
+        self.sort_column = None
+        self.sort_ascending = True
+        self.filters = []
+        self.row_order = None
+        
+        style_row_height = ttk.Style().lookup("Treeview", "rowheight")
+        self.row_height = int(style_row_height) if style_row_height else self.DEFAULT_ROW_HEIGHT
+        
+        self.scrollbar_x = ttk.Scrollbar(self, orient=tk.HORIZONTAL)
+        self.scrollbar_y = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_yscroll)
+        self.tree = ttk.Treeview(self, show="headings", xscrollcommand=self.scrollbar_x.set)
+        self.scrollbar_x.config(command=self.tree.xview)
+        
+        self.scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.visible_rows))
+    
+    @property
+    def total_rows(self):
+        """数据总行数"""
+        return 0 if self.data is None else len(self.data)
+    
+    @property
+    def row_count(self):
+        """排序筛选后显示的行数"""
+        return self.total_rows if self.row_order is None else len(self.row_order)
+    
+    def set_data(self, data, column_widths=None, default_width=100):
+        """设置要显示的数据，column_widths 可为部分列单独指定宽度
+
+        数据变化后排序和筛选索引重新建立；若排序列和筛选列仍然存在，则保留当前的排序和筛选条件
+        """
+        self.data = data
+        self.first_row = 0
+        self.index = TableIndex(data) if data is not None else None
+        column_widths = column_widths or {}
+        
+        columns = [] if data is None else list(data.columns)
+        if self.sort_column not in columns:
+            self.sort_column = None
+        self.filters = [condition for condition in self.filters if condition[1] in columns]
+        
+        self.tree["columns"] = [str(col) for col in columns]
+        for col in columns:
+            self.tree.column(str(col), width=column_widths.get(col, default_width), anchor=tk.CENTER)
+        self.update_headings()
+        self.update_row_order()
+    
+    def clear(self):
+        """清空表格"""
+        self.set_data(None)
+    
+    def update_headings(self):
+        """刷新列标题，排序列显示排序方向"""
+        if self.data is None:
+            return
+        for col in self.data.columns:
+            text = str(col)
+            if col == self.sort_column:
+                text += " ▲" if self.sort_ascending else " ▼"
+            command = (lambda c=col: self.toggle_sort(c)) if self.sortable else ""
+            self.tree.heading(str(col), text=text, command=command)
+    
+    def toggle_sort(self, column):
+        """点击列标题：首次升序，再次点击切换为降序"""
+        if self.sort_column == column:
+            self.sort_ascending = not self.sort_ascending
+        else:
+            self.sort_column = column
+            self.sort_ascending = True
+        self.update_headings()
+        self.update_row_order()
+    
+    def set_filters(self, filters):
+        """设置筛选条件列表，每个条件为 TableIndex.mask 的参数元组"""
+        self.filters = list(filters)
+        self.update_row_order()
+    
+    def update_row_order(self, keep_position=False):
+        """根据排序和筛选条件重新计算显示顺序，默认回到顶部"""
+        self.row_order = None
+        if self.index is not None:
+            self.row_order = self.index.row_order(self.sort_column, self.sort_ascending, self.filters)
+        if not keep_position:
+            self.first_row = 0
+        self.refresh()
+        self.event_generate("<<TableViewChanged>>")
+    
+    def data_changed(self):
+        """数据被原地修改后调用：重建排序和筛选索引，保持当前的滚动位置"""
+        self.index = TableIndex(self.data) if self.data is not None else None
+        self.update_row_order(keep_position=True)
+    
+    def row_position(self, item):
+        """表格条目对应的数据行位置"""
+        display_row = self.first_row + self.tree.index(item)
+        return display_row if self.row_order is None else int(self.row_order[display_row])
+    
+    def window_rows(self, first, count):
+        """返回显示顺序中从第 first 行开始的 count 行数据，每行为一个取值元组"""
+        if self.row_order is None:
+            rows = self.data.iloc[first:first + count]
+        else:
+            rows = self.data.iloc[self.row_order[first:first + count]]
+        return rows.itertuples(index=False, name=None)
+    
+    def refresh(self):
+        """按当前滚动位置重新填充可见行"""
+        total = self.row_count
+        self.first_row = max(0, min(self.first_row, total - self.visible_rows))
+        rows = list(self.window_rows(self.first_row, self.visible_rows)) if total else []
+        
+        items = self.tree.get_children()
+        # 只在可见行数变化时增删条目，滚动时仅更新条目的值
+        for item in items[len(rows):]:
+            self.tree.delete(item)
+        for i, values in enumerate(rows):
+            if i < len(items):
+                self.tree.item(items[i], values=values)
+            else:
+                self.tree.insert("", tk.END, values=values)
+        
+        if total:
+            self.scrollbar_y.set(self.first_row / total, min((self.first_row + self.visible_rows) / total, 1.0))
+        else:
+            self.scrollbar_y.set(0, 1)
+    
+    def scroll_rows(self, delta):
+        """向下滚动 delta 行（负数向上）"""
+        self.first_row += delta
+        self.refresh()
+        return "break"
+    
+    def on_yscroll(self, action, *args):
+        """处理垂直滚动条的拖动和点击"""
+        if action == "moveto":
+            self.first_row = int(float(args[0]) * self.row_count)
+            self.refresh()
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            self.scroll_rows(amount * (self.visible_rows if unit == "pages" else 1))
+    
+    def on_mousewheel(self, event):
+        """鼠标滚轮滚动（Windows/macOS）"""
+        return self.scroll_rows(-3 if event.delta > 0 else 3)
+    
+    def on_resize(self, event):
+        """窗口大小变化时重新计算可见行数"""
+        visible_rows = max(1, (event.height - self.HEADING_HEIGHT) // self.row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.refresh()
+
+
 class StudentDataGenerator:
     """学生数据生成器类"""
-    def __init__(self, parent):
+    def __init__(self, parent, on_append=None):
         self.parent = parent
         self.window = None
+        # 把生成的数据追加到分析数据的回调
+        self.on_append = on_append
         
         # 存储科目设置的变量
         self.subject_vars = {}
@@ -115,7 +771,7 @@ class StudentDataGenerator:
         # 学生数量设置
         ttk.Label(settings_frame, text="学生数量:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
         self.student_count = tk.IntVar(value=50)
-        ttk.Spinbox(settings_frame, from_=1, to=1000, textvariable=self.student_count, width=10).grid(
+        ttk.Spinbox(settings_frame, from_=1, to=10000000, textvariable=self.student_count, width=10).grid(
             row=0, column=1, padx=5, pady=5, sticky=tk.W)
         
         # 学号前缀设置
@@ -131,6 +787,24 @@ class StudentDataGenerator:
         class_combo['values'] = ["随机分配"] + CLASSES
         class_combo.grid(row=0, column=5, padx=5, pady=5, sticky=tk.W)
         
+        # 并行进程数设置（大于1时按块在多个进程中并行生成，结果与进程数无关）
+        # 每块固定为 DEFAULT_CHUNK_SIZE 名学生（块大小决定各块的种子），不超过一块时只能单进程生成
+        ttk.Label(settings_frame, text="并行进程数:").grid(row=1, column=0, padx=5, pady=5, sticky=tk.W)
+        self.worker_count = tk.IntVar(value=1)
+        self.worker_spinbox = ttk.Spinbox(settings_frame, from_=1, to=os.cpu_count() or 1, 
+                                          textvariable=self.worker_count, width=10)
+        self.worker_spinbox.grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
+        self.worker_note = ttk.Label(settings_frame, foreground="gray")
+        self.worker_note.grid(row=2, column=0, columnspan=4, padx=5, sticky=tk.W)
+        self.student_count.trace_add("write", lambda *args: self.update_worker_state())
+        self.update_worker_state()
+        
+        # 科目间相关系数设置（0 表示各科目独立生成）
+        ttk.Label(settings_frame, text="科目相关系数:").grid(row=1, column=2, padx=5, pady=5, sticky=tk.W)
+        self.correlation = tk.DoubleVar(value=0.0)
+        ttk.Entry(settings_frame, textvariable=self.correlation, width=10).grid(
+            row=1, column=3, padx=5, pady=5, sticky=tk.W)
+        
         # 科目设置区域
         subjects_frame = ttk.LabelFrame(main_frame, text="科目设置", padding="10")
         subjects_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
@@ -201,88 +875,37 @@ class StudentDataGenerator:
         
         ttk.Button(button_frame, text="生成数据", command=self.generate_data).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="导出数据", command=self.export_data).pack(side=tk.LEFT, padx=5)
+        if self.on_append is not None:
+            ttk.Button(button_frame, text="追加到分析数据", command=self.append_to_analysis).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="重置设置", command=self.reset_settings).pack(side=tk.RIGHT, padx=5)
         
+        # 状态信息
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(button_frame, textvariable=self.status_var).pack(side=tk.LEFT, padx=15)
+        
         # 结果展示区域
         result_frame = ttk.LabelFrame(main_frame, text="生成结果预览", padding="10")
         result_frame.pack(fill=tk.BOTH, expand=True)
         
-        # 结果表格
-        table_frame = ttk.Frame(result_frame)
-        table_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # 滚动条
-        scrollbar_x = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL)
-        scrollbar_y = ttk.Scrollbar(table_frame, orient=tk.VERTICAL)
-        
-        # 树状表格
-        self.result_tree = ttk.Treeview(
-            table_frame,
-            yscrollcommand=scrollbar_y.set,
-            xscrollcommand=scrollbar_x.set
-        )
-        scrollbar_x.config(command=self.result_tree.xview)
-        scrollbar_y.config(command=self.result_tree.yview)
-        
-        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
-        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
-        self.result_tree.pack(fill=tk.BOTH, expand=True)
-    
-    def generate_name(self):
-        """随机生成姓名"""
-        family_name = random.choice(FAMILY_NAMES)
-        given_name = random.choice(GIVEN_NAMES)
-        return family_name + given_name
-    
-    def generate_id(self, index):
-        """生成学号"""
-        prefix = self.id_prefix.get()
-        # 生成固定长度的序号，确保学号长度一致
-        return f"{prefix}{index + 1:04d}"
-    
-    def generate_class(self):
-        """生成班级"""
-        class_range = self.class_range.get()
-        if class_range == "随机分配":
-            return random.choice(CLASSES)
-        return class_range
-    
-    def generate_scores_for_subject(self, subject, student_count):
-        """为特定科目生成所有学生的成绩，确保及格率不低于设定值"""
-        name = subject["name"]
-        min_val = self.subject_min[name].get()
-        max_val = self.subject_max[name].get()
-        pass_score = self.subject_pass[name].get()
-        pass_rate = self.subject_pass_rate[name].get() / 100
-        
-        # 确保参数有效
-        if min_val > max_val:
-            min_val, max_val = max_val, min_val
-        
-        # 计算最少需要多少个及格成绩
-        min_pass_count = int(pass_rate * student_count)
-        # 如果计算结果为0但及格率大于0，至少保证1个及格成绩
-        if min_pass_count == 0 and pass_rate > 0:
-            min_pass_count = 1
-        
-        # 先生成确保达标的及格成绩
-        scores = []
-        # 添加必要的及格成绩
-        for _ in range(min_pass_count):
-            scores.append(random.randint(pass_score, max_val))
-        
-        # 生成剩余的成绩，可以是及格或不及格
-        remaining = student_count - min_pass_count
-        for _ in range(remaining):
-            # 50%概率生成及格成绩，使最终及格率可能高于设定值
-            if random.random() < 0.5:
-                scores.append(random.randint(pass_score, max_val))
-            else:
-                scores.append(random.randint(min_val, pass_score - 1))
-        
-        # 打乱成绩顺序
-        random.shuffle(scores)
-        return scores
+        # 结果表格（虚拟化显示，可浏览全部生成的数据）
+        self.result_table = VirtualTable(result_frame)
+        self.result_table.pack(fill=tk.BOTH, expand=True)
+    
+    def collect_subject_settings(self):
+        """收集界面中选中科目的设置"""
+        subjects = []
+        for subject in SUBJECTS:
+            name = subject["name"]
+            if not self.subject_vars[name].get():
+                continue
+            subjects.append({
+                "name": name,
+                "min": self.subject_min[name].get(),
+                "max": self.subject_max[name].get(),
+                "pass_score": self.subject_pass[name].get(),
+                "pass_rate": self.subject_pass_rate[name].get()
+            })
+        return subjects
     
     def generate_data(self):
         """生成学生数据"""
@@ -293,41 +916,19 @@ class StudentDataGenerator:
                 return
             
             # 收集选中的科目
-            selected_subjects = [subj for subj in SUBJECTS 
-                               if self.subject_vars[subj["name"]].get()]
+            selected_subjects = self.collect_subject_settings()
             
             if not selected_subjects:
                 messagebox.showwarning("警告", "请至少选择一个科目")
                 return
             
-            # 准备数据结构
-            data = []
-            columns = ["序号", "学号", "姓名", "班级"] + [subj["name"] for subj in selected_subjects]
-            
-            # 生成基本信息
-            basic_info = []
-            for i in range(count):
-                basic_info.append({
-                    "序号": i + 1,
-                    "学号": self.generate_id(i),
-                    "姓名": self.generate_name(),
-                    "班级": self.generate_class()
-                })
-            
-            # 为每个科目生成成绩
-            subject_scores = {}
-            for subj in selected_subjects:
-                subject_scores[subj["name"]] = self.generate_scores_for_subject(subj, count)
-            
-            # 合并基本信息和成绩
-            for i in range(count):
-                row = basic_info[i].copy()
-                for subj in selected_subjects:
-                    row[subj["name"]] = subject_scores[subj["name"]][i]
-                data.append(row)
-            
-            # 转换为DataFrame
-            self.generated_data = pd.DataFrame(data)
+            # 各列直接以数组形式批量生成，再组装为DataFrame
+            correlation = self.correlation.get() or None
+            engine = StudentDataEngine(selected_subjects, self.id_prefix.get(), self.class_range.get(),
+                                       correlation=correlation)
+            self.generated_data, saved = compact_dtypes(
+                engine.generate_dataset(count, workers=max(self.worker_count.get(), 1)))
+            self.status_var.set(format_memory_report(self.generated_data, saved))
             
             # 更新表格显示
             self.update_result_table()
@@ -339,32 +940,12 @@ class StudentDataGenerator:
     
     def update_result_table(self):
         """更新结果表格"""
-        # 清空现有数据
-        for item in self.result_tree.get_children():
-            self.result_tree.delete(item)
-        
         if self.generated_data is None:
+            self.result_table.clear()
             return
         
-        # 设置列
-        columns = list(self.generated_data.columns)
-        self.result_tree["columns"] = columns
-        self.result_tree["show"] = "headings"
-        
-        # 设置列名和宽度
-        for col in columns:
-            self.result_tree.heading(col, text=col)
-            width = 80 if col in ["姓名", "班级"] else 60
-            self.result_tree.column(col, width=width, anchor=tk.CENTER)
-        
-        # 填充数据（只显示前50行，避免表格过大）
-        display_data = self.generated_data.head(50)
-        for _, row in display_data.iterrows():
-            self.result_tree.insert("", tk.END, values=list(row))
-        
-        # 如果有更多数据，显示提示
-        if len(self.generated_data) > 50:
-            self.result_tree.insert("", tk.END, values=["...", "仅显示前50行", "...", "..."] + ["..." for _ in range(len(columns)-4)])
+        # 设置列宽，姓名和班级列稍宽
+        self.result_table.set_data(self.generated_data, column_widths={"姓名": 80, "班级": 80}, default_width=60)
     
     def export_data(self):
         """导出数据"""
@@ -400,12 +981,35 @@ class StudentDataGenerator:
         except Exception as e:
             messagebox.showerror("错误", f"导出数据失败: {str(e)}")
     
+    def append_to_analysis(self):
+        """把生成的数据追加到主界面的分析数据中"""
+        if self.generated_data is None:
+            messagebox.showwarning("警告", "请先生成数据")
+            return
+        self.on_append(self.generated_data)
+    
+    def update_worker_state(self):
+        """学生数量不超过一块（DEFAULT_CHUNK_SIZE）时禁用并行进程数，并说明原因"""
+        try:
+            count = self.student_count.get()
+        except tk.TclError:
+            return  # 数量输入框正在编辑，内容暂不是整数
+        if count > DEFAULT_CHUNK_SIZE:
+            self.worker_spinbox.configure(state="normal")
+            self.worker_note.configure(text="")
+        else:
+            self.worker_spinbox.configure(state="disabled")
+            self.worker_note.configure(
+                text=f"数据按每 {DEFAULT_CHUNK_SIZE:,} 名学生一块生成，学生数量超过一块时才能多进程并行生成")
+    
     def reset_settings(self):
         """重置设置为默认值"""
         # 重置学生数量
         self.student_count.set(50)
         self.id_prefix.set("2023")
         self.class_range.set("随机分配")
+        self.worker_count.set(1)
+        self.correlation.set(0.0)
         
         # 重置科目设置
         for subject in SUBJECTS:
@@ -418,11 +1022,1853 @@ class StudentDataGenerator:
         
         # 清空结果
         self.generated_data = None
-        for item in self.result_tree.get_children():
-            self.result_tree.delete(item)
+        self.status_var.set("")
+        self.result_table.clear()
+
+
+def iter_table_chunks(file_path, chunk_size=IMPORT_CHUNK_SIZE):
+    """分块读取 CSV/Excel/Parquet 数据文件，依次返回 (数据块, 已完成比例)
+
+    .xls 文件无法流式读取，会整体读取后作为一个数据块返回
+    """
+    lower_path = file_path.lower()
+    if lower_path.endswith(".csv"):
+        total_bytes = max(os.path.getsize(file_path), 1)
+        with open(file_path, "rb") as f:
+            for chunk in pd.read_csv(f, chunksize=chunk_size):
+                yield chunk, min(f.tell() / total_bytes, 1.0)
+    elif lower_path.endswith((".parquet", ".pq")):
+        pa, pq = import_pyarrow()
+        parquet_file = pq.ParquetFile(file_path)
+        total_rows = max(parquet_file.metadata.num_rows, 1)
+        rows = 0
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            rows += len(chunk)
+            yield chunk, rows / total_rows
+    elif lower_path.endswith(".xlsx"):
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            total_rows = max((sheet.max_row or 1) - 1, 1)
+            row_iter = sheet.iter_rows(values_only=True)
+            header = next(row_iter, None)
+            if header is None:
+                return
+            columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+            rows = []
+            read_rows = 0
+            for row in row_iter:
+                rows.append(row)
+                if len(rows) >= chunk_size:
+                    read_rows += len(rows)
+                    yield pd.DataFrame(rows, columns=columns), min(read_rows / total_rows, 1.0)
+                    rows = []
+            if rows:
+                yield pd.DataFrame(rows, columns=columns), 1.0
+        finally:
+            workbook.close()
+    else:  # .xls 等其他Excel文件
+        yield pd.read_excel(file_path), 1.0
+
+
+class ImportCache:
+    """导入文件的列式缓存
+
+    在源文件旁保存一份 Feather 格式的副本（需要 pyarrow），以源文件路径、大小、修改时间和内容哈希为键。
+    大小和修改时间一致时直接读取缓存；修改时间变化但内容哈希未变时仍可使用缓存；否则回退到读取源文件。
+    """
+    DATA_SUFFIX = ".cache.feather"
+    META_SUFFIX = ".cache.json"
+    HASH_BLOCK_SIZE = 1 << 20
+    
+    def __init__(self, source_path):
+        self.source_path = os.path.abspath(source_path)
+        directory, name = os.path.split(self.source_path)
+        self.data_path = os.path.join(directory, f".{name}{self.DATA_SUFFIX}")
+        self.meta_path = os.path.join(directory, f".{name}{self.META_SUFFIX}")
+    
+    @staticmethod
+    def available():
+        """缓存依赖 pyarrow，未安装时不启用"""
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    
+    def source_signature(self):
+        """源文件的大小和修改时间"""
+        stat = os.stat(self.source_path)
+        return stat.st_size, stat.st_mtime_ns
+    
+    def content_hash(self):
+        """计算源文件内容的哈希值"""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(self.source_path, "rb") as f:
+            for block in iter(lambda: f.read(self.HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def load(self):
+        """读取缓存，缓存不存在或已失效时返回 None"""
+        if not self.available() or not os.path.exists(self.data_path):
+            return None
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            size, mtime = self.source_signature()
+            if meta.get("path") != self.source_path or meta.get("size") != size:
+                return None
+            if meta.get("mtime") != mtime:
+                # 文件被改写或复制过，内容可能未变：比较内容哈希
+                if meta.get("hash") != self.content_hash():
+                    return None
+                if self.source_signature() != (size, mtime):
+                    return None  # 计算哈希期间文件又被修改
+                meta["mtime"] = mtime
+                self.write_meta(meta)
+            return pd.read_feather(self.data_path)
+        except Exception as e:
+            print(f"读取导入缓存失败，改为读取源文件: {e}")
+            return None
+    
+    def store(self, data, signature):
+        """写入缓存，失败时（如目录不可写）只打印提示，不影响导入
+
+        signature 为开始读取源文件之前的 source_signature()；读取或计算哈希期间文件被修改时不写入，
+        以免把旧内容的数据和新文件的元数据保存在一起
+        """
+        if not self.available():
+            return
+        temp_path = self.data_path + ".tmp"
+        try:
+            content_hash = self.content_hash()
+            if self.source_signature() != signature:
+                print("导入期间源文件已被修改，不写入导入缓存")
+                return
+            size, mtime = signature
+            meta = {"path": self.source_path, "size": size, "mtime": mtime, "hash": content_hash}
+            data.to_feather(temp_path)
+            os.replace(temp_path, self.data_path)
+            self.write_meta(meta)
+        except Exception as e:
+            print(f"写入导入缓存失败: {e}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+    
+    def write_meta(self, meta):
+        """写入缓存元数据"""
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+
+class BackgroundImportTask:
+    """在后台线程中分块读取数据文件，通过消息队列向界面线程汇报进度"""
+    def __init__(self, file_path, chunk_size=IMPORT_CHUNK_SIZE, use_cache=True):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        # Parquet 本身就是列式格式，只为 Excel/CSV 建立缓存
+        self.cache = ImportCache(file_path) if use_cache and not file_path.lower().endswith((".parquet", ".pq")) else None
+        self.from_cache = False
+        self.saved_bytes = 0
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+    
+    def start(self):
+        """启动后台读取"""
+        self.thread.start()
+    
+    def cancel(self):
+        """请求取消，读取线程在处理下一个数据块前退出"""
+        self.cancel_event.set()
+    
+    def run(self):
+        """后台线程：逐块读取文件并汇报进度，完成后把合并好的DataFrame放入消息队列"""
+        try:
+            if self.cache is not None:
+                data = self.cache.load()
+                if data is not None:
+                    self.from_cache = True
+                    self.messages.put(("progress", len(data), 1.0))
+                    self.messages.put(("done", data))
+                    return
+            
+            # 在读取之前记录源文件的大小和修改时间，写入缓存时据此判断读取期间文件是否被修改
+            signature = self.cache.source_signature() if self.cache is not None else None
+            chunks = []
+            rows = 0
+            for chunk, fraction in iter_table_chunks(self.file_path, self.chunk_size):
+                if self.cancel_event.is_set():
+                    self.messages.put(("cancelled",))
+                    return
+                chunks.append(chunk)
+                rows += len(chunk)
+                self.messages.put(("progress", rows, fraction))
+            
+            if self.cancel_event.is_set():
+                self.messages.put(("cancelled",))
+                return
+            data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+            self.messages.put(("status", "正在压缩数据类型..."))
+            data, self.saved_bytes = compact_dtypes(data)
+            if self.cache is not None:
+                self.messages.put(("status", "正在写入导入缓存..."))
+                self.cache.store(data, signature)
+            self.messages.put(("done", data))
+        except Exception as e:
+            self.messages.put(("error", str(e)))
+
+
+class StreamingStatsTask(BackgroundImportTask):
+    """在后台线程中分块统计数据文件（不载入内存），完成后把 StatsReport 放入消息队列"""
+    def __init__(self, file_path, chunk_size=IMPORT_CHUNK_SIZE):
+        super().__init__(file_path, chunk_size, use_cache=False)
+    
+    def run(self):
+        """后台线程：逐块累计统计量并汇报进度"""
+        try:
+            report = stream_file_stats(
+                self.file_path, self.chunk_size, 
+                progress=lambda rows, fraction: self.messages.put(("progress", rows, fraction)),
+                should_stop=self.cancel_event.is_set)
+            if report is None:
+                self.messages.put(("cancelled",))
+            else:
+                self.messages.put(("done", report))
+        except Exception as e:
+            self.messages.put(("error", str(e)))
+
+
+# matplotlib 不是线程安全的（文字排版、字体缓存和 mathtext 为全局共享），后台渲染线程和界面线程中的
+# 构造、渲染和保存图表都须持有此锁
+MATPLOTLIB_LOCK = threading.RLock()
+
+
+def render_figure_png(figure, dpi=100, tight=False):
+    """用 Agg 把图表渲染为 PNG 字节，不经过 pyplot 和界面线程；tight 为 True 时裁掉图表四周的空白"""
+    buffer = io.BytesIO()
+    with MATPLOTLIB_LOCK:
+        FigureCanvasAgg(figure)
+        figure.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight" if tight else None)
+    return buffer.getvalue()
+
+
+def data_fingerprint(data):
+    """成绩数据的内容哈希：列名、数据类型和逐行哈希相同的数据得到相同的指纹"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in data.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def chart_code_version():
+    """作图代码的版本：缓存版本号、matplotlib 版本和本程序文件的内容哈希，修改作图代码后旧缓存自动失效"""
+    global CHART_CODE_VERSION
+    if CHART_CODE_VERSION is None:
+        digest = hashlib.blake2b(digest_size=20)
+        try:
+            with open(os.path.abspath(__file__), "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(str(time.time()).encode("ascii"))  # 读不到源文件时本次运行不复用旧缓存
+        CHART_CODE_VERSION = (CHART_CACHE_VERSION, matplotlib.__version__, digest.hexdigest())
+    return CHART_CODE_VERSION
+
+
+CHART_CODE_VERSION = None
+
+
+def chart_cache_key(build):
+    """作图函数的缓存键：作图代码版本、字体设置、函数的限定名加上 partial 绑定的简单参数（如科目名、图表标题）
+
+    作图函数使用的其余数据都由成绩数据决定，已包含在数据指纹中
+    """
+    args = ()
+    if isinstance(build, partial):
+        args = tuple(arg for arg in build.args if isinstance(arg, (str, int, float)))
+        build = build.func
+    style = (tuple(plt.rcParams["font.family"]), plt.rcParams["axes.unicode_minus"])
+    return chart_code_version() + style + (build.__module__, build.__qualname__) + args
+
+
+class ChartRenderCache:
+    """磁盘上的图表 PNG 缓存，按内容寻址并按最近使用淘汰
+
+    以 (数据指纹, 图表类型和参数, 尺寸, DPI, 是否裁边) 的哈希为文件名保存渲染结果，屏幕显示、导出（300 DPI）
+    和PDF报告（150 DPI）在数据不变时都直接读取已渲染的图片。命中时更新文件修改时间，
+    总大小超过上限时从最久未使用的文件开始删除。读写失败时只打印提示，不影响作图
+    """
+    SUFFIX = ".png"
+    
+    def __init__(self, directory=CHART_CACHE_DIR, max_bytes=CHART_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.sizes = None  # 文件名 -> 字节数，首次使用时扫描目录
+    
+    @staticmethod
+    def key(*parts):
+        """缓存键：各组成部分的哈希"""
+        return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=20).hexdigest()
+    
+    def path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+    
+    def scan(self):
+        """扫描缓存目录，记录已有文件的大小"""
+        if self.sizes is not None:
+            return
+        self.sizes = {}
+        # 缓存目录只允许当前用户访问
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        os.chmod(self.directory, 0o700)
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                self.sizes[entry.name] = entry.stat().st_size
+    
+    def get(self, key):
+        """读取缓存的 PNG，没有缓存时返回 None"""
+        with self.lock:
+            try:
+                self.scan()
+                path = self.path(key)
+                if os.path.basename(path) not in self.sizes:
+                    return None
+                with open(path, "rb") as f:
+                    png = f.read()
+                os.utime(path)  # 记录最近使用时间
+                return png
+            except OSError as e:
+                print(f"读取图表缓存失败: {e}")
+                return None
+    
+    def put(self, key, png):
+        """保存 PNG，必要时淘汰最久未使用的文件"""
+        with self.lock:
+            try:
+                self.scan()
+                path = self.path(key)
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(png)
+                os.replace(temp_path, path)
+                self.sizes[os.path.basename(path)] = len(png)
+                self.trim()
+            except OSError as e:
+                print(f"写入图表缓存失败: {e}")
+    
+    def trim(self):
+        """总大小超过上限时，按修改时间从旧到新删除文件"""
+        total = sum(self.sizes.values())
+        if total <= self.max_bytes:
+            return
+        entries = []
+        for name in self.sizes:
+            try:
+                entries.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+            except OSError:
+                entries.append((0, name))
+        for _, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            total -= self.sizes.pop(name)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+    
+    def png(self, key, dpi, tight, build):
+        """返回 (Figure 或 None, PNG)：命中缓存时不构造图表，否则调用 build() 构造、渲染并写入缓存"""
+        cache_key = self.key(key, dpi, tight)
+        png = self.get(cache_key)
+        if png is not None:
+            return None, png
+        figure = build()
+        png = render_figure_png(figure, dpi, tight)
+        self.put(cache_key, png)
+        return figure, png
+
+
+class ChartRenderTask:
+    """后台渲染线程：按请求构造图表并渲染为 PNG，通过消息队列交给界面线程显示
+
+    charts 中每一项为 (图表尺寸, 构造函数, 缓存键)，构造函数在给定的 Figure 上作图，只能使用面向对象接口（不经过 pyplot），
+    所需的数据须在界面线程中准备好。构造和渲染都持有 MATPLOTLIB_LOCK，导出时在界面线程中补齐图表
+    也不会与后台线程同时作图。给定 cache 时先查找已渲染的 PNG，命中时不再构造图表。
+    开始新的分析时取消旧任务，后台线程处理完当前图表后退出
+    """
+    def __init__(self, charts, dpi=100, cache=None):
+        self.charts = charts
+        self.dpi = dpi
+        self.cache = cache
+        self.requests = queue.Queue()
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+    
+    def start(self):
+        """启动后台渲染线程"""
+        self.thread.start()
+    
+    def cancel(self):
+        """请求取消，渲染线程在处理下一个请求前退出"""
+        self.cancel_event.set()
+        self.requests.put(None)
+    
+    def request(self, index):
+        """请求渲染第 index 个图表"""
+        self.requests.put(index)
+    
+    def build(self, index):
+        """构造第 index 个图表（可在任意线程调用，与其他线程中的作图互斥）"""
+        size, build, _ = self.charts[index]
+        with MATPLOTLIB_LOCK:
+            figure = Figure(figsize=size, dpi=self.dpi)
+            build(figure)
+        return figure
+    
+    def png(self, index, dpi, tight=False, figure=None):
+        """返回 (Figure 或 None, PNG)：第 index 个图表在给定 DPI 下的渲染结果，优先使用缓存
+
+        figure 为已构造的图表时直接渲染它，不再重新构造
+        """
+        build = (lambda: figure) if figure is not None else partial(self.build, index)
+        if self.cache is None:
+            figure = build()
+            return figure, render_figure_png(figure, dpi, tight)
+        size, _, key = self.charts[index]
+        return self.cache.png((key, size), dpi, tight, build)
+    
+    def run(self):
+        """后台线程：依次处理渲染请求，每完成一个图表就放入消息队列"""
+        while True:
+            index = self.requests.get()
+            if index is None or self.cancel_event.is_set():
+                return
+            try:
+                self.messages.put(("chart", index) + self.png(index, self.dpi))
+            except Exception as e:
+                self.messages.put(("error", index, str(e)))
+
+
+class FigureManager:
+    """分析图表的所有者：记录存活的 Figure 及其图片占用的内存，超过上限时释放最久未显示的图表
+
+    每个图表以键登记，并提供一个释放回调；回调返回 False 表示该图表正在显示、暂不能释放。
+    被释放或丢弃的 Figure 会被清空，使其中的图形对象和渲染缓冲区尽快回收；
+    直接使用缓存图片显示的图表没有 Figure，只计图片占用的内存
+    """
+    def __init__(self, max_figures=MAX_LIVE_FIGURES, max_bytes=MAX_FIGURE_MEMORY, on_change=None):
+        self.max_figures = max_figures
+        self.max_bytes = max_bytes
+        self.on_change = on_change
+        self.entries = {}  # 键 -> (Figure, 估计字节数, 释放回调)，按最近显示的先后排列
+    
+    @property
+    def live_count(self):
+        """当前存活的图表数量"""
+        return len(self.entries)
+    
+    @property
+    def live_bytes(self):
+        """当前存活图表的估计内存（字节）"""
+        return sum(nbytes for _, nbytes, _ in self.entries.values())
+    
+    @staticmethod
+    def estimate_bytes(size, dpi, figure):
+        """估计一个已显示图表的内存：界面图片占 宽×高×4 字节，有 Figure 时 Agg 渲染缓冲区再占同样大小"""
+        image_bytes = int(size[0] * dpi) * int(size[1] * dpi) * 4
+        return image_bytes * (2 if figure is not None else 1)
+    
+    def add(self, key, figure, nbytes, release):
+        """登记一个已显示的图表，必要时释放最久未显示的其他图表"""
+        self.discard(key, notify=False)
+        self.entries[key] = (figure, nbytes, release)
+        self.trim()
+        self.notify()
+    
+    def touch(self, key):
+        """图表仍在显示，移到最近使用的位置"""
+        if key in self.entries:
+            self.entries[key] = self.entries.pop(key)
+    
+    def discard(self, key, notify=True):
+        """丢弃一个图表（由其所有者调用，不再调用释放回调）"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            if entry[0] is not None:
+                with MATPLOTLIB_LOCK:
+                    entry[0].clear()
+            if notify:
+                self.notify()
+    
+    def discard_owner(self, owner):
+        """丢弃某个视图的全部图表，键的第一项为所属视图"""
+        for key in [key for key in self.entries if key[0] is owner]:
+            self.discard(key, notify=False)
+        self.notify()
+    
+    def trim(self):
+        """超过数量或内存上限时，从最久未显示的图表开始释放"""
+        for key in list(self.entries):
+            if len(self.entries) <= self.max_figures and self.live_bytes <= self.max_bytes:
+                break
+            figure, _, release = self.entries[key]
+            if release(key) is not False:
+                self.entries.pop(key)
+                if figure is not None:
+                    with MATPLOTLIB_LOCK:
+                        figure.clear()
+    
+    def notify(self):
+        if self.on_change is not None:
+            self.on_change(self.live_count, self.live_bytes)
+
+
+class LazyChartView:
+    """可视化面板中按滚动位置按需渲染的一组图表
+
+    每个图表先放一个与图片同样大小的占位区域，只有滚动到可见范围附近的图表才交给后台线程渲染；
+    离开可见范围较远的图表释放图片和 Figure，内存占用和首次显示时间不随图表数量增长。
+    渲染完成的图表登记到 FigureManager，由它统一限制存活图表的数量和内存
+    """
+    POLL_INTERVAL = 100  # 毫秒
+    RENDER_MARGIN = 1.0  # 可见范围上下各提前渲染一屏
+    RELEASE_MARGIN = 3.0  # 离可见范围超过三屏的图表被释放
+    
+    def __init__(self, root, canvas, charts, figure_manager, cache=None, dpi=100):
+        self.root = root
+        self.canvas = canvas
+        self.figure_manager = figure_manager
+        self.dpi = dpi
+        self.task = ChartRenderTask([(size, build, key) for _, size, build, key in charts], dpi, cache)
+        self.figures = [None] * len(charts)
+        self.images = [None] * len(charts)
+        self.pending = set()
+        self.visible = set()
+        self.labels = []
+        for frame, size, _, _ in charts:
+            holder = tk.Frame(frame, width=int(size[0] * dpi), height=int(size[1] * dpi))
+            holder.pack_propagate(False)
+            holder.pack(fill=tk.X)
+            label = ttk.Label(holder, text="正在生成图表...", anchor=tk.CENTER)
+            label.pack(fill=tk.BOTH, expand=True)
+            self.labels.append(label)
+        self.task.start()
+        self.closed = False
+        # 等界面完成布局后再根据位置决定渲染哪些图表
+        self.root.after(self.POLL_INTERVAL, self.poll)
+    
+    def close(self):
+        """停止渲染并释放全部图表"""
+        self.closed = True
+        self.task.cancel()
+        self.figure_manager.discard_owner(self)
+        self.figures = [None] * len(self.figures)
+        self.images = [None] * len(self.images)
+    
+    def release(self, key):
+        """FigureManager 的释放回调：释放一个图表的图片和 Figure，可见范围附近的图表不释放"""
+        index = key[1]
+        if index in self.visible:
+            return False
+        self.figures[index] = None
+        self.images[index] = None
+        if self.labels[index].winfo_exists():
+            self.labels[index].configure(image="", text="正在生成图表...")
+        return True
+    
+    def distance(self, holder, top, bottom):
+        """占位区域到可见范围 [top, bottom] 的距离（以屏为单位），在可见范围内时为 0"""
+        # 占位区域在滚动区域中的纵坐标：逐级累加到直接放在画布中的框架为止
+        y, widget = 0, holder
+        while widget.master is not self.canvas:
+            y += widget.winfo_y()
+            widget = widget.master
+        screen = bottom - top
+        if y + holder.winfo_height() < top:
+            return (top - y - holder.winfo_height()) / screen
+        if y > bottom:
+            return (y - bottom) / screen
+        return 0.0
+    
+    def update_visible(self):
+        """请求渲染可见范围附近的图表，释放远离可见范围的图表"""
+        if self.canvas.winfo_height() <= 1:
+            return  # 尚未完成布局
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        self.visible.clear()
+        for index, label in enumerate(self.labels):
+            if not label.winfo_exists() or label.master.winfo_height() <= 1:
+                continue
+            distance = self.distance(label.master, top, bottom)
+            if distance <= self.RENDER_MARGIN:
+                self.visible.add(index)
+                if self.images[index] is None and index not in self.pending:
+                    self.pending.add(index)
+                    self.task.request(index)
+                else:
+                    self.figure_manager.touch((self, index))
+            elif distance > self.RELEASE_MARGIN and self.images[index] is not None:
+                self.figure_manager.discard((self, index))
+                self.release((self, index))
+    
+    def poll(self):
+        """显示渲染完成的图表，并根据滚动位置请求或释放图表"""
+        if self.closed or not self.canvas.winfo_exists():
+            self.close()
+            return
+        try:
+            while True:
+                message = self.task.messages.get_nowait()
+                index = message[1]
+                self.pending.discard(index)
+                label = self.labels[index]
+                if not label.winfo_exists():
+                    continue
+                if message[0] == "chart":
+                    self.figures[index] = message[2]
+                    self.images[index] = tk.PhotoImage(data=base64.b64encode(message[3]).decode("ascii"))
+                    label.configure(image=self.images[index], text="")
+                    nbytes = FigureManager.estimate_bytes(self.task.charts[index][0], self.dpi, message[2])
+                    self.figure_manager.add((self, index), message[2], nbytes, self.release)
+                else:
+                    label.configure(text=f"图表生成失败: {message[2]}")
+        except queue.Empty:
+            pass
+        self.update_visible()
+        self.root.after(self.POLL_INTERVAL, self.poll)
+    
+    def all_figures(self):
+        """全部图表的 Figure（用于导出），未渲染或已释放的图表在界面线程中重新构造"""
+        return [figure if figure is not None else self.task.build(index) 
+                for index, figure in enumerate(self.figures)]
+    
+    def chart_png(self, index, dpi, tight=True):
+        """第 index 个图表在给定 DPI 下的 PNG（用于导出和PDF报告），优先使用渲染缓存，其次使用已构造的 Figure"""
+        return self.task.png(index, dpi, tight, self.figures[index])[1]
+
+
+class ImportProgressDialog:
+    """数据导入进度窗口：显示进度条和读取速度，支持取消"""
+    POLL_INTERVAL = 100  # 毫秒
+    
+    def __init__(self, parent, task, on_done, title="导入数据", action="正在导入"):
+        self.parent = parent
+        self.task = task
+        self.on_done = on_done
+        self.started_at = time.monotonic()
+        
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("420x150")
+        self.window.resizable(False, False)
+        self.window.transient(parent)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+        
+        frame = ttk.Frame(self.window, padding="15")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame, text=f"{action}: {os.path.basename(task.file_path)}").pack(anchor=tk.W)
+        self.progress = ttk.Progressbar(frame, mode="determinate", maximum=100)
+        self.progress.pack(fill=tk.X, pady=10)
+        self.status_var = tk.StringVar(value="正在读取...")
+        ttk.Label(frame, textvariable=self.status_var).pack(anchor=tk.W)
+        self.cancel_button = ttk.Button(frame, text="取消", command=self.cancel)
+        self.cancel_button.pack(anchor=tk.E, pady=(10, 0))
+    
+    def start(self):
+        """启动后台任务并开始轮询消息"""
+        self.task.start()
+        self.window.after(self.POLL_INTERVAL, self.poll)
+    
+    def cancel(self):
+        """取消导入"""
+        self.task.cancel()
+        self.status_var.set("正在取消...")
+        self.cancel_button.config(state=tk.DISABLED)
+    
+    def poll(self):
+        """在界面线程中处理后台任务发来的消息"""
+        try:
+            while True:
+                message = self.task.messages.get_nowait()
+                kind = message[0]
+                if kind == "progress":
+                    _, rows, fraction = message
+                    elapsed = max(time.monotonic() - self.started_at, 1e-6)
+                    self.progress["value"] = fraction * 100
+                    self.status_var.set(f"已读取 {rows:,} 行，{rows / elapsed:,.0f} 行/秒")
+                elif kind == "status":
+                    self.status_var.set(message[1])
+                else:
+                    self.window.destroy()
+                    self.on_done(kind, message[1] if len(message) > 1 else None)
+                    return
+        except queue.Empty:
+            pass
+        self.window.after(self.POLL_INTERVAL, self.poll)
+
+
+ID_COLUMNS = ["序号", "学号"]
+METADATA_COLUMNS = ["姓名", "班级"]
+DERIVED_COLUMNS = ["总分", "平均分", "排名", "班级排名"]
+
+
+def detect_full_mark(max_score):
+    """根据科目最高分推断满分：不超过100按100分制，不超过150按150分制，否则以最高分为满分"""
+    if pd.isna(max_score) or max_score <= 100:
+        return 100
+    if max_score <= 150:
+        return 150
+    return float(max_score)
+
+
+class DataSchema:
+    """成绩数据的列分类
+
+    编号列（序号、学号）、信息列（姓名、班级及其他非数值列）、计算列（总分、平均分、排名、班级排名），
+    其余数值列为科目列；各科目的满分由数据中的最高分推断，及格分和优秀分分别为满分的60%和90%
+    """
+    PASS_RATIO = 0.6
+    EXCELLENT_RATIO = 0.9
+    
+    def __init__(self, id_columns, metadata_columns, subjects, derived_columns, full_marks):
+        self.id_columns = id_columns
+        self.metadata_columns = metadata_columns
+        self.subjects = subjects
+        self.derived_columns = derived_columns
+        self.full_marks = full_marks
+    
+    @classmethod
+    def infer(cls, data):
+        """扫描一次数据的列，推断列分类和各科目的满分"""
+        id_columns, metadata_columns, subjects, derived_columns = [], [], [], []
+        for col in data.columns:
+            if col in ID_COLUMNS:
+                id_columns.append(col)
+            elif col in DERIVED_COLUMNS:
+                derived_columns.append(col)
+            elif col in METADATA_COLUMNS or not pd.api.types.is_numeric_dtype(data[col]):
+                metadata_columns.append(col)
+            else:
+                subjects.append(col)
+        
+        max_scores = data[subjects].max() if subjects else pd.Series(dtype=float)
+        full_marks = {subject: detect_full_mark(max_scores[subject]) for subject in subjects}
+        return cls(id_columns, metadata_columns, subjects, derived_columns, full_marks)
+    
+    def pass_line(self, subject):
+        """科目及格分"""
+        return self.full_marks[subject] * self.PASS_RATIO
+    
+    def excellent_line(self, subject):
+        """科目优秀分"""
+        return self.full_marks[subject] * self.EXCELLENT_RATIO
+
+
+# 统计结果中的四分位数
+QUARTILES = [0.25, 0.5, 0.75]
+STAT_COLUMNS = ["人数", "平均分", "标准差", "最小值", "25%分位数", "中位数", "75%分位数", "最大值"]
+
+
+def exact_quantiles(values, qs):
+    """一列分数的精确分位数（线性插值，与 describe_matrix 一致），只对所需的名次做部分排序"""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return np.full(len(qs), np.nan)
+    position = np.asarray(qs, dtype=np.float64) * (len(values) - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, len(values) - 1)
+    partitioned = np.partition(values, np.unique(np.concatenate([lower, upper])))
+    fraction = position - lower
+    return partitioned[lower] * (1 - fraction) + partitioned[upper] * fraction
+
+
+def describe_matrix(values):
+    """按行计算统计指标，values 为 (列数, 行数) 的 float64 矩阵，缺失值为 NaN
+
+    排序一次得到最小值、最大值和各分位数（线性插值，与 pandas 一致），返回以 STAT_COLUMNS 为键的数组字典
+    """
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(valid, values, 0.0).sum(axis=1) / counts
+        deviations = np.where(valid, values - means[:, None], 0.0)
+        stds = np.sqrt((deviations * deviations).sum(axis=1) / (counts - 1))
+    del deviations
+    
+    # NaN 排在每行末尾，前 counts 个为有效值
+    sorted_values = np.sort(values, axis=1)
+    rows = np.arange(len(values))
+    last = np.maximum(counts - 1, 0)
+    
+    def quantile(q):
+        position = q * last
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        fraction = position - lower
+        result = sorted_values[rows, lower] * (1 - fraction) + sorted_values[rows, upper] * fraction
+        return np.where(counts > 0, result, np.nan)
+    
+    columns = [counts, means, np.where(counts > 1, stds, np.nan), quantile(0.0), 
+               quantile(0.25), quantile(0.5), quantile(0.75), quantile(1.0)]
+    return dict(zip(STAT_COLUMNS, columns))
+
+
+class StatsReport:
+    """统计分析结果，界面显示、Excel导出和PDF报告都由它渲染"""
+    def __init__(self, record_count, student_count, subjects, table, total=None, top_students=None):
+        self.record_count = record_count
+        self.student_count = student_count
+        self.subjects = subjects
+        self.table = table
+        self.total = total
+        self.top_students = top_students
+    
+    @property
+    def overall_mean(self):
+        """各科目平均分的平均值"""
+        return float(self.table["平均分"].mean())
+    
+    @property
+    def best_subject(self):
+        """平均分最高的科目"""
+        return self.table["平均分"].idxmax()
+    
+    @property
+    def worst_subject(self):
+        """平均分最低的科目"""
+        return self.table["平均分"].idxmin()
+    
+    @property
+    def overall_pass_rate(self):
+        """所有科目合计的及格率（%）"""
+        return float(self.table["及格率"].mean())
+
+
+class StatsEngine:
+    """成绩统计引擎（不依赖界面），一次向量化计算所有科目的统计指标
+
+    pass_line 和 excellent_line 可以是统一的分数线，也可以是与科目顺序对应的分数线序列
+    """
+    def __init__(self, pass_line=60, excellent_line=90, top_count=10):
+        self.pass_line = pass_line
+        self.excellent_line = excellent_line
+        self.top_count = top_count
+    
+    @staticmethod
+    def score_matrix(data, columns):
+        """把若干列转换为 (列数, 行数) 的 float64 矩阵，非数值和缺失值为 NaN"""
+        values = np.empty((len(columns), len(data)), dtype=np.float64)
+        for i, col in enumerate(columns):
+            series = data[col]
+            if not pd.api.types.is_numeric_dtype(series):
+                series = pd.to_numeric(series, errors="coerce")
+            values[i] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        return values
+    
+    def compute(self, data, subject_columns):
+        """计算各科目及总分的统计指标，返回 StatsReport"""
+        subjects = list(subject_columns)
+        record_count = len(data)
+        has_total = "总分" in data.columns
+        
+        # 各科目和总分放在同一个矩阵中一次计算
+        values = self.score_matrix(data, subjects + (["总分"] if has_total else []))
+        stats = describe_matrix(values)
+        table = pd.DataFrame(stats, index=pd.Index(subjects + (["总分"] if has_total else []), name="科目"))
+        
+        subject_values = values[:len(subjects)]
+        pass_line = np.broadcast_to(np.asarray(self.pass_line, dtype=np.float64), (len(subjects),))
+        excellent_line = np.broadcast_to(np.asarray(self.excellent_line, dtype=np.float64), (len(subjects),))
+        # 及格率和优秀率按总记录数计算，缺失成绩视为未达到
+        denominator = max(record_count, 1)
+        pass_rates = (subject_values >= pass_line[:, None]).sum(axis=1) / denominator * 100
+        excellent_rates = (subject_values >= excellent_line[:, None]).sum(axis=1) / denominator * 100
+        
+        total = table.loc["总分"] if has_total else None
+        table = table.iloc[:len(subjects)].copy()
+        table["及格率"] = pass_rates
+        table["优秀率"] = excellent_rates
+        table["及格分"] = pass_line
+        table["优秀分"] = excellent_line
+        
+        top_students = None
+        if has_total and self.top_count:
+            columns = [col for col in ["学号", "姓名", "班级", "总分", "排名"] if col in data.columns]
+            top_students = data.iloc[top_k_positions(data["总分"], self.top_count)][columns]
+        
+        student_count = data["姓名"].nunique() if "姓名" in data.columns else None
+        return StatsReport(record_count, student_count, subjects, table, total, top_students)
+
+
+def format_stats_report(report):
+    """把统计结果格式化为文本，界面显示和命令行输出共用"""
+    lines = ["===== 基本统计信息 =====\n\n", f"总记录数: {report.record_count}\n"]
+    if report.student_count is not None:
+        lines.append(f"学生人数: {report.student_count}\n\n")
+    
+    # 科目统计
+    lines.append("===== 各科目统计 =====\n\n")
+    for subject, row in report.table.iterrows():
+        lines.append(f"{subject}:\n")
+        lines.append(f"  平均分: {row['平均分']:.2f}\n")
+        lines.append(f"  最高分: {row['最大值']:g}\n")
+        lines.append(f"  最低分: {row['最小值']:g}\n")
+        lines.append(f"  及格率: {row['及格率']:.2f}%\n")
+        lines.append(f"  优秀率(>={row['优秀分']:g}): {row['优秀率']:.2f}%\n\n")
+    
+    # 总分统计
+    if report.total is not None:
+        lines.append("===== 总分统计 =====\n\n")
+        lines.append(f"  平均分: {report.total['平均分']:.2f}\n")
+        lines.append(f"  最高分: {report.total['最大值']:g}\n")
+        lines.append(f"  最低分: {report.total['最小值']:g}\n\n")
+    
+    # 各科目详细统计
+    lines.append("===== 各科目详细统计 =====\n\n")
+    for subject, row in report.table.iterrows():
+        lines.append(f"{subject}:")
+        lines.append(f"\n  平均分: {row['平均分']:.2f}")
+        lines.append(f"\n  中位数: {row['中位数']:.2f}")
+        lines.append(f"\n  标准差: {row['标准差']:.2f}")
+        lines.append(f"\n  最小值: {row['最小值']:g}")
+        lines.append(f"\n  最大值: {row['最大值']:g}")
+        lines.append(f"\n  25%分位数: {row['25%分位数']:.2f}")
+        lines.append(f"\n  75%分位数: {row['75%分位数']:.2f}\n\n")
+    return "".join(lines)
+
+
+class ScoreHistogram:
+    """固定分辨率、可合并的分数直方图，用于流式统计中的分位数和达线人数
+
+    第 i 个箱覆盖 [i*resolution, (i+1)*resolution)。箱数超过 max_bins 时分辨率加倍、相邻两箱合并，
+    因此内存占用有上限。分数为分辨率的整数倍时（如整数分、半分），分位数和达线人数都是精确的
+    """
+    def __init__(self, resolution=0.5, max_bins=1 << 16):
+        self.resolution = resolution
+        self.max_bins = max_bins
+        self.offset = 0  # counts[0] 对应的箱编号
+        self.counts = np.zeros(0, dtype=np.int64)
+    
+    @property
+    def total(self):
+        """已累计的分数个数"""
+        return int(self.counts.sum())
+    
+    def coarsen(self):
+        """分辨率加倍，相邻两箱合并"""
+        start = self.offset // 2
+        counts = np.concatenate([np.zeros(self.offset - start * 2, dtype=np.int64), self.counts])
+        if len(counts) % 2:
+            counts = np.append(counts, 0)
+        self.counts = counts.reshape(-1, 2).sum(axis=1)
+        self.offset = start
+        self.resolution *= 2
+    
+    def add_counts(self, offset, counts):
+        """把从箱编号 offset 开始的计数累加进来"""
+        if not len(counts):
+            return
+        if not len(self.counts):
+            low, high = offset, offset + len(counts)
+        else:
+            low = min(self.offset, offset)
+            high = max(self.offset + len(self.counts), offset + len(counts))
+        if low != self.offset or high - low != len(self.counts):
+            grown = np.zeros(high - low, dtype=np.int64)
+            grown[self.offset - low:self.offset - low + len(self.counts)] = self.counts
+            self.counts = grown
+            self.offset = low
+        self.counts[offset - self.offset:offset - self.offset + len(counts)] += counts
+        while len(self.counts) > self.max_bins:
+            self.coarsen()
+    
+    def add(self, values):
+        """累计一批分数（不含缺失值）"""
+        if not len(values):
+            return
+        bins = np.floor(np.asarray(values) / self.resolution).astype(np.int64)
+        low, high = int(bins.min()), int(bins.max())
+        # 这批分数的范围过大时先降低分辨率，避免一次分配过多的箱
+        while high - low >= self.max_bins:
+            self.coarsen()
+            bins //= 2
+            low, high = low // 2, high // 2
+        self.add_counts(low, np.bincount(bins - low))
+    
+    def merge(self, other):
+        """合并另一个直方图（两者的初始分辨率必须相同）"""
+        other_counts, other_offset, other_resolution = other.counts, other.offset, other.resolution
+        while self.resolution < other_resolution:
+            self.coarsen()
+        if other_resolution < self.resolution:
+            other = ScoreHistogram(other_resolution, other.max_bins)
+            other.counts, other.offset = other_counts, other_offset
+            while other.resolution < self.resolution:
+                other.coarsen()
+            other_counts, other_offset = other.counts, other.offset
+        self.add_counts(other_offset, other_counts)
+    
+    def count_at_least(self, threshold):
+        """不低于 threshold 的分数个数"""
+        first = int(np.ceil(threshold / self.resolution)) - self.offset
+        return int(self.counts[max(first, 0):].sum())
+    
+    def quantiles(self, qs):
+        """按线性插值（与 pandas 一致）估计分位数，每个分数取所在箱的下边界"""
+        total = self.total
+        if total == 0:
+            return np.full(len(qs), np.nan)
+        cumulative = np.cumsum(self.counts)
+        positions = np.asarray(qs, dtype=np.float64) * (total - 1)
+        lower = np.floor(positions)
+        upper = np.minimum(lower + 1, total - 1)
+        
+        def value_at(rank):
+            return (self.offset + np.searchsorted(cumulative, rank, side="right")) * self.resolution
+        
+        return value_at(lower) + (positions - lower) * (value_at(upper) - value_at(lower))
+
+
+class StreamingStats:
+    """分块累计的成绩统计量，可合并，内存占用只与列数有关而与行数无关
+
+    均值和方差用 Welford/Chan 的合并公式累计，另外记录最小值、最大值、每列的 ScoreHistogram
+    （用于中位数、四分位数和达线人数）以及总分最高的若干名学生
+    """
+    def __init__(self, columns, top_count=10):
+        size = len(columns)
+        self.columns = list(columns)
+        self.top_count = top_count
+        self.record_count = 0
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.histograms = [ScoreHistogram() for _ in range(size)]
+        self.top_students = None
+    
+    def merge_moments(self, count, mean, m2):
+        """合并另一组 (人数, 均值, 离差平方和)"""
+        total = self.count + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - self.mean
+            weight = np.where(total > 0, count / total, 0.0)
+            self.mean = np.where(count > 0, self.mean + delta * weight, self.mean)
+            self.m2 = np.where(count > 0, self.m2 + m2 + delta * delta * self.count * weight, self.m2)
+        self.count = total
+    
+    def update(self, chunk):
+        """累计一个数据块"""
+        values = StatsEngine.score_matrix(chunk, self.columns)
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(valid, values, 0.0).sum(axis=1) / count
+            deviations = np.where(valid, values - mean[:, None], 0.0)
+        self.merge_moments(count, np.nan_to_num(mean), (deviations * deviations).sum(axis=1))
+        
+        self.min = np.minimum(self.min, np.where(valid, values, np.inf).min(axis=1, initial=np.inf))
+        self.max = np.maximum(self.max, np.where(valid, values, -np.inf).max(axis=1, initial=-np.inf))
+        for histogram, row, row_valid in zip(self.histograms, values, valid):
+            histogram.add(row[row_valid])
+        self.record_count += len(chunk)
+        
+        if self.top_count and "总分" in chunk.columns:
+            columns = [col for col in ["学号", "姓名", "班级", "总分"] if col in chunk.columns]
+            self.merge_top_students(chunk.nlargest(self.top_count, "总分")[columns])
+    
+    def merge_top_students(self, candidates):
+        """合并总分最高的候选学生，只保留前 top_count 名"""
+        if self.top_students is not None:
+            candidates = pd.concat([self.top_students, candidates], ignore_index=True)
+        self.top_students = candidates.nlargest(self.top_count, "总分").reset_index(drop=True)
+    
+    def merge(self, other):
+        """合并另一个分块统计结果（列必须相同）"""
+        self.merge_moments(other.count, other.mean, other.m2)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for histogram, other_histogram in zip(self.histograms, other.histograms):
+            histogram.merge(other_histogram)
+        self.record_count += other.record_count
+        if other.top_students is not None:
+            self.merge_top_students(other.top_students)
+    
+    def report(self, subjects):
+        """生成与 StatsEngine 相同结构的 StatsReport；满分、及格分和优秀分按累计的最高分推断"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stds = np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+        positions = [self.columns.index(subject) for subject in subjects]
+        full_marks = np.array([detect_full_mark(self.max[i] if self.count[i] else np.nan) for i in positions], 
+                              dtype=np.float64)
+        
+        top_students = self.top_students
+        if top_students is not None:
+            top_students = top_students.copy()
+            top_students["排名"] = top_students["总分"].rank(ascending=False, method="min").astype(int)
+        return histogram_stats_report(
+            self.columns, self.count, self.mean, stds, self.min, self.max, self.histograms, subjects, 
+            full_marks * DataSchema.PASS_RATIO, full_marks * DataSchema.EXCELLENT_RATIO, 
+            self.record_count, None, top_students)
+
+
+def histogram_stats_report(columns, count, mean, std, minimum, maximum, histograms, subjects, 
+                           pass_line, excellent_line, record_count, student_count=None, top_students=None, 
+                           quantiles=None, line_counts=None):
+    """由累计量（人数、均值、标准差、最值和每列的 ScoreHistogram）生成 StatsReport
+
+    流式统计和并行统计共用。quantiles 为每列精确的 25%/50%/75% 分位数，line_counts 为各科目精确的
+    (及格人数, 优秀人数)（并行统计）；未给出时（流式统计）分位数和达线人数取自直方图
+    """
+    has_values = count > 0
+    if quantiles is None:
+        quantiles = [histogram.quantiles(QUARTILES) for histogram in histograms]
+    quantiles = np.asarray(quantiles, dtype=np.float64).reshape(-1, 3)
+    stat_values = [np.asarray(count).astype(np.int64), np.where(has_values, mean, np.nan), std, np.where(has_values, minimum, np.nan), 
+                   quantiles[:, 0], quantiles[:, 1], quantiles[:, 2], np.where(has_values, maximum, np.nan)]
+    table = pd.DataFrame(dict(zip(STAT_COLUMNS, stat_values)), index=pd.Index(list(columns), name="科目"))
+    
+    total = table.loc["总分"] if "总分" in table.index else None
+    table = table.loc[list(subjects)].copy()
+    denominator = max(record_count, 1)
+    if line_counts is None:
+        positions = [list(columns).index(subject) for subject in subjects]
+        line_counts = ([histograms[i].count_at_least(line) for i, line in zip(positions, pass_line)], 
+                       [histograms[i].count_at_least(line) for i, line in zip(positions, excellent_line)])
+    table["及格率"] = np.asarray(line_counts[0], dtype=np.float64) / denominator * 100
+    table["优秀率"] = np.asarray(line_counts[1], dtype=np.float64) / denominator * 100
+    table["及格分"] = np.asarray(pass_line, dtype=np.float64)
+    table["优秀分"] = np.asarray(excellent_line, dtype=np.float64)
+    return StatsReport(record_count, student_count, list(subjects), table, total, top_students)
+
+
+def stream_file_stats(file_path, chunk_size=IMPORT_CHUNK_SIZE, progress=None, should_stop=None):
+    """分块读取数据文件并累计统计量，不把整个文件载入内存，返回 StatsReport
+
+    列分类按第一个数据块推断；文件中没有总分列时按各科目之和计算。progress(行数, 已完成比例)
+    在每块之后调用；should_stop() 返回 True 时中止并返回 None
+    """
+    stats = None
+    subjects = []
+    for chunk, fraction in iter_table_chunks(file_path, chunk_size):
+        if should_stop is not None and should_stop():
+            return None
+        if stats is None:
+            subjects = DataSchema.infer(chunk).subjects
+            if not subjects:
+                raise ValueError("未识别到科目列")
+            stats = StreamingStats(subjects + ["总分"])
+        if "总分" not in chunk.columns:
+            chunk["总分"] = chunk[subjects].sum(axis=1)
+        stats.update(chunk)
+        if progress is not None:
+            progress(stats.record_count, fraction)
+    
+    if stats is None:
+        raise ValueError("文件中没有数据")
+    return stats.report(subjects)
+
+
+class CoMoments:
+    """两两列的协矩：同时有值的人数、和、平方和与交叉积，相关系数矩阵和趋势线都由它得到
+
+    各统计量相对 center（通常为列均值）累计，中心化后的数值较小，float32 矩阵乘法也不会因大数相减损失精度。
+    两两统计量只在两列同时有值的行上累计，与 pandas 的 corr 一致，选修课等大量缺失的列也能正确计算
+    """
+    BLOCK_ROWS = 1 << 16  # 每次矩阵乘法的行数：块内 float32 累加误差很小，块间用 float64 累加
+    
+    def __init__(self, columns, center, pair_count, pair_sum, pair_sumsq, cross_sum):
+        self.columns = list(columns)
+        self.center = center
+        # pair_count[i, j]: 第 i、j 列同时有值的行数；pair_sum[i, j]、pair_sumsq[i, j]: 这些行上第 i 列的和、平方和
+        self.pair_count = pair_count
+        self.pair_sum = pair_sum
+        self.pair_sumsq = pair_sumsq
+        self.cross_sum = cross_sum
+    
+    @classmethod
+    def from_data(cls, data, columns):
+        """计算 data 中 columns 列的协矩：按列均值中心化为 float32，每块一次 [Xc | Xc² | M] @ [Xc | M]ᵀ 矩阵乘法"""
+        size, rows = len(columns), len(data)
+        values = np.empty((size, rows), dtype=np.float32)
+        center = np.zeros(size)
+        for i, column in enumerate(columns):
+            series = StatsEngine.score_matrix(data, [column])[0]
+            count = np.count_nonzero(~np.isnan(series))
+            center[i] = np.nansum(series) / count if count else 0.0
+            values[i] = series - center[i]
+        
+        sums = np.zeros((3 * size, 2 * size))
+        for start in range(0, rows, cls.BLOCK_ROWS):
+            block = values[:, start:start + cls.BLOCK_ROWS]
+            valid = ~np.isnan(block)
+            mask = valid.astype(np.float32)
+            centered = np.where(valid, block, np.float32(0))
+            sums += np.vstack([centered, centered * centered, mask]) @ np.vstack([centered, mask]).T
+        return cls(columns, center, sums[2 * size:, size:], sums[:size, size:], sums[size:2 * size, size:], 
+                   sums[:size, :size])
+    
+    def covariances(self):
+        """两两同时有值的行上的 (离差积和, 第 i 列离差平方和, 第 j 列离差平方和)"""
+        n = self.pair_count
+        sum_x, sum_y = self.pair_sum, self.pair_sum.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            covariance = self.cross_sum - sum_x * sum_y / n
+            variance_x = self.pair_sumsq - sum_x * sum_x / n
+        return covariance, variance_x, variance_x.T
+    
+    def correlation(self):
+        """两两相关系数矩阵（DataFrame）"""
+        covariance, variance_x, variance_y = self.covariances()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = covariance / np.sqrt(variance_x * variance_y)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.diag(self.pair_count) > 1, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+    
+    def trend_line(self, x, y):
+        """y 列对 x 列的最小二乘直线（只用两列同时有值的行），返回 (斜率, 截距)"""
+        i, j = self.columns.index(x), self.columns.index(y)
+        n = self.pair_count[i, j]
+        covariance, variance_x, _ = self.covariances()
+        if n < 2 or not variance_x[i, j] > 0:
+            return np.nan, np.nan
+        slope = covariance[i, j] / variance_x[i, j]
+        mean_x = self.center[i] + self.pair_sum[i, j] / n
+        mean_y = self.center[j] + self.pair_sum[j, i] / n
+        return slope, mean_y - slope * mean_x
+
+
+class PartialAggregates:
+    """可精确合并的部分聚合结果，用于 map-reduce 并行分析
+
+    每个分片计算人数、和、平方和、两两列的交叉积（相关系数所需的协矩）、每列的 ScoreHistogram
+    以及每列不低于给定分数线（thresholds 的每一行为一组分数线，NaN 表示不统计）的人数；合并时直接相加，与分片方式无关。两两统计量只在两列同时有值的行上累计，
+    与 pandas 的 corr 一致。分位数不能由分片合并，由 compute_aggregates 在完整的得分矩阵上另行计算后放入 quantiles
+    """
+    BLOCK_ROWS = 1 << 18  # 每次矩阵乘法处理的行数，限制临时内存
+    
+    def __init__(self, size, thresholds=None):
+        self.record_count = 0
+        # pair_count[i, j]: 第 i、j 列同时有值的行数；pair_sum[i, j]、pair_sumsq[i, j]: 这些行上第 i 列的和、平方和
+        self.pair_count = np.zeros((size, size))
+        self.pair_sum = np.zeros((size, size))
+        self.pair_sumsq = np.zeros((size, size))
+        self.cross_sum = np.zeros((size, size))
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.histograms = [ScoreHistogram() for _ in range(size)]
+        # thresholds[k, i]: 第 k 组分数线中第 i 列的分数线；threshold_count[k, i]: 第 i 列不低于该分数线的人数
+        self.thresholds = np.zeros((0, size)) if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+        self.threshold_count = np.zeros(self.thresholds.shape, dtype=np.int64)
+        self.quantiles = None  # 每列精确的 25%/50%/75% 分位数
+    
+    @classmethod
+    def from_block(cls, values, thresholds=None):
+        """计算一段数据的部分聚合，values 为 (列数, 行数) 矩阵，thresholds 为 (组数, 列数) 的分数线"""
+        size, rows = values.shape
+        result = cls(size, thresholds)
+        result.record_count = rows
+        for start in range(0, rows, cls.BLOCK_ROWS):
+            block = values[:, start:start + cls.BLOCK_ROWS]
+            valid = ~np.isnan(block)
+            mask = valid.astype(np.float64)
+            filled = np.where(valid, block, 0.0)
+            
+            # [X0 | X0² | M] 与 Mᵀ 一次矩阵乘法得到两两的和、平方和与人数
+            products = np.vstack([filled, filled * filled, mask]) @ mask.T
+            result.pair_sum += products[:size]
+            result.pair_sumsq += products[size:2 * size]
+            result.pair_count += products[2 * size:]
+            result.cross_sum += filled @ filled.T
+            
+            result.min = np.minimum(result.min, np.where(valid, block, np.inf).min(axis=1, initial=np.inf))
+            result.max = np.maximum(result.max, np.where(valid, block, -np.inf).max(axis=1, initial=-np.inf))
+            for histogram, row, row_valid in zip(result.histograms, block, valid):
+                histogram.add(row[row_valid])
+            for k, lines in enumerate(result.thresholds):
+                # 缺失成绩和 NaN 分数线的比较结果都为 False
+                result.threshold_count[k] += (block >= lines[:, None]).sum(axis=1)
+        return result
+    
+    def merge(self, other):
+        """合并另一个分片的部分聚合"""
+        self.record_count += other.record_count
+        self.pair_count += other.pair_count
+        self.pair_sum += other.pair_sum
+        self.pair_sumsq += other.pair_sumsq
+        self.cross_sum += other.cross_sum
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for histogram, other_histogram in zip(self.histograms, other.histograms):
+            histogram.merge(other_histogram)
+        self.threshold_count += other.threshold_count
+    
+    def count_at_least(self, column, line):
+        """第 column 列不低于 line 的人数：line 在累计的分数线中时为精确计数，否则由直方图得到"""
+        for lines, counts in zip(self.thresholds, self.threshold_count):
+            if lines[column] == line:
+                return int(counts[column])
+        return self.histograms[column].count_at_least(line)
+    
+    def moments(self):
+        """返回每列的 (人数, 均值, 标准差)"""
+        count = np.diag(self.pair_count).copy()
+        total = np.diag(self.pair_sum)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            variance = np.maximum(np.diag(self.pair_sumsq) - total * mean, 0.0) / (count - 1)
+        return count, mean, np.where(count > 1, np.sqrt(variance), np.nan)
+    
+    def comoments(self, columns):
+        """两两列的协矩（未中心化）"""
+        return CoMoments(columns, np.zeros(len(columns)), self.pair_count, self.pair_sum, self.pair_sumsq, 
+                         self.cross_sum)
+    
+    def report(self, columns, subjects, pass_line, excellent_line, student_count=None, top_students=None):
+        """生成与 StatsEngine 相同结构的 StatsReport"""
+        count, mean, std = self.moments()
+        positions = [list(columns).index(subject) for subject in subjects]
+        line_counts = ([self.count_at_least(i, line) for i, line in zip(positions, pass_line)], 
+                       [self.count_at_least(i, line) for i, line in zip(positions, excellent_line)])
+        return histogram_stats_report(columns, count, mean, std, self.min, self.max, self.histograms, subjects, 
+                                      pass_line, excellent_line, self.record_count, student_count, top_students, 
+                                      self.quantiles, line_counts)
+
+
+def partial_aggregates_task(values_name, shape, thresholds, start, stop):
+    """并行分析的工作进程：从共享内存中读取 [start, stop) 行并计算部分聚合"""
+    from multiprocessing import shared_memory
+    values_memory = shared_memory.SharedMemory(name=values_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=values_memory.buf)[:, start:stop]
+        result = PartialAggregates.from_block(values, thresholds)
+        # 关闭共享内存前必须释放指向它的数组
+        del values
+        return result
+    finally:
+        values_memory.close()
+
+
+def column_quantiles_task(values_name, shape, row):
+    """并行分析的工作进程：从共享内存中读取第 row 列并计算精确的四分位数"""
+    from multiprocessing import shared_memory
+    values_memory = shared_memory.SharedMemory(name=values_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=values_memory.buf)[row]
+        result = exact_quantiles(values, QUARTILES)
+        del values
+        return result
+    finally:
+        values_memory.close()
+
+
+def compute_aggregates(data, columns, workers=1, thresholds=None):
+    """计算若干列的 PartialAggregates，thresholds 为要精确统计达线人数的分数线（(组数, 列数)，NaN 表示不统计）
+
+    workers 大于1时把得分矩阵放入共享内存，按行范围分片交给进程池计算后合并，各列的精确分位数
+    也在共享内存上按列并行计算；否则在当前进程中计算。两种方式的结果在浮点误差范围内一致
+    """
+    rows = len(data)
+    if workers <= 1 or rows < 2:
+        values = StatsEngine.score_matrix(data, columns)
+        result = PartialAggregates.from_block(values, thresholds)
+        result.quantiles = np.array([exact_quantiles(row, QUARTILES) for row in values]).reshape(-1, 3)
+        return result
+    
+    from multiprocessing import shared_memory
+    shape = (len(columns), rows)
+    values_memory = shared_memory.SharedMemory(create=True, size=max(8 * shape[0] * shape[1], 1))
+    try:
+        # 直接把各列写入共享内存，避免再复制一份得分矩阵
+        values = np.ndarray(shape, dtype=np.float64, buffer=values_memory.buf)
+        for i, col in enumerate(columns):
+            series = data[col]
+            if not pd.api.types.is_numeric_dtype(series):
+                series = pd.to_numeric(series, errors="coerce")
+            values[i] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        del values
+        
+        bounds = np.linspace(0, rows, workers + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = executor.map(partial_aggregates_task, repeat(values_memory.name), repeat(shape), 
+                                    repeat(thresholds), bounds[:-1], bounds[1:])
+            quantiles = executor.map(column_quantiles_task, repeat(values_memory.name), repeat(shape), 
+                                     range(len(columns)))
+            result = None
+            for partial in partials:
+                if result is None:
+                    result = partial
+                else:
+                    result.merge(partial)
+            result.quantiles = np.array(list(quantiles)).reshape(-1, 3)
+        return result
+    finally:
+        values_memory.close()
+        values_memory.unlink()
+
+
+class ClassIndex:
+    """班级索引：班级 → 行位置，每个数据版本只建立一次
+
+    按班级编码稳定排序一次，每个班级的行位置是排序结果中连续的一段
+    """
+    def __init__(self, classes):
+        if isinstance(classes.dtype, pd.CategoricalDtype):
+            codes = classes.cat.codes.to_numpy().astype(np.int64)
+            labels = list(classes.cat.categories)
+        else:
+            codes, uniques = pd.factorize(classes, sort=True)
+            codes = codes.astype(np.int64)
+            labels = list(uniques)
+        
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        # 缺失班级的编码为 -1，排在最前面
+        self.order = np.argsort(codes, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+        self.codes = codes
+        # 只保留有学生的班级
+        self.labels = [label for label, count in zip(labels, counts) if count]
+        self.positions = {label: i for i, label in enumerate(labels)}
+    
+    def rows(self, label):
+        """班级 label 的行位置"""
+        i = self.positions[label]
+        return self.order[self.offsets[i]:self.offsets[i + 1]]
+    
+    def size(self, label):
+        """班级人数"""
+        i = self.positions[label]
+        return int(self.offsets[i + 1] - self.offsets[i])
+
+
+class ClassStatsCube:
+    """班级 × 科目 × 统计指标的预计算立方体
+
+    指标包括 STAT_COLUMNS 中的各项以及及格率、优秀率（按班级人数计算），班级视图、班级对比图表和
+    PDF报告的班级页面都从这里读取，不再重新分组
+    """
+    METRICS = STAT_COLUMNS + ["及格率", "优秀率"]
+    
+    def __init__(self, labels, subjects, values):
+        self.labels = labels
+        self.subjects = subjects
+        self.values = values  # 形状为 (班级数, 科目数, 指标数)
+    
+    @classmethod
+    def build(cls, data, class_index, subjects, pass_line, excellent_line):
+        """按班级索引计算立方体：得分矩阵按班级重排一次后，每个班级是连续的一段"""
+        matrix = StatsEngine.score_matrix(data, subjects)[:, class_index.order]
+        pass_line = np.asarray(pass_line, dtype=np.float64)[:, None]
+        excellent_line = np.asarray(excellent_line, dtype=np.float64)[:, None]
+        
+        values = np.empty((len(class_index.labels), len(subjects), len(cls.METRICS)))
+        for i, label in enumerate(class_index.labels):
+            position = class_index.positions[label]
+            block = matrix[:, class_index.offsets[position]:class_index.offsets[position + 1]]
+            stats = describe_matrix(block)
+            size = block.shape[1]
+            stats["及格率"] = (block >= pass_line).sum(axis=1) / size * 100
+            stats["优秀率"] = (block >= excellent_line).sum(axis=1) / size * 100
+            values[i] = np.column_stack([stats[metric] for metric in cls.METRICS])
+        return cls(list(class_index.labels), list(subjects), values)
+    
+    def metric(self, name):
+        """某一指标的 班级 × 科目 表"""
+        return pd.DataFrame(self.values[:, :, self.METRICS.index(name)], 
+                            index=pd.Index(self.labels, name="班级"), columns=self.subjects)
+    
+    def class_table(self, label):
+        """某个班级的 科目 × 指标 表"""
+        table = pd.DataFrame(self.values[self.labels.index(label)], 
+                             index=pd.Index(self.subjects, name="科目"), columns=self.METRICS)
+        table["人数"] = table["人数"].astype(np.int64)
+        return table
+
+
+def score_bands(full_mark):
+    """满分为 full_mark 时的分数段，返回 (分段边界, 标签)
+
+    各段左闭右开，最后一段包含满分：不及格 [0, 60%)、及格、中等、良好、优秀 [90%, 满分]
+    """
+    if full_mark == 100:
+        labels = ['不及格\n(0-59)', '及格\n(60-69)', '中等\n(70-79)', '良好\n(80-89)', '优秀\n(90-100)']
+    elif full_mark == 150:
+        labels = ['不及格\n(0-89)', '及格\n(90-104)', '中等\n(105-119)', '良好\n(120-134)', '优秀\n(135-150)']
+    else:
+        # 对于其他满分制，使用百分比分段
+        labels = ['不及格', '及格', '中等', '良好', '优秀']
+    edges = [0, full_mark * 0.6, full_mark * 0.7, full_mark * 0.8, full_mark * 0.9, full_mark]
+    return edges, labels
+
+
+class BinnedScores:
+    """一列分数的细分箱计数，直方图、分数段饼图、密度曲线和百分位查询共用
+
+    每个数据版本每列只对原始数据分箱一次（ScoreHistogram 的固定分辨率箱，第 i 个箱代表分数 i*resolution），
+    之后的直方图由相邻细箱合并得到，密度曲线对箱计数做 FFT 卷积，绘图开销只与箱数有关而与行数无关。
+    分数为分辨率的整数倍时（整数分、半分），各种由箱计数得到的结果都是精确的
+    """
+    def __init__(self, values, resolution=0.5):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        histogram = ScoreHistogram(resolution)
+        histogram.add(values)
+        self.resolution = histogram.resolution
+        self.offset = histogram.offset
+        self.counts = histogram.counts
+        self.count = len(values)
+        self.std = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+    
+    @property
+    def points(self):
+        """各细箱代表的分数"""
+        return (self.offset + np.arange(len(self.counts))) * self.resolution
+    
+    def histogram(self, bins):
+        """把细箱合并成不超过 bins 个等宽的箱，返回 (计数, 箱边界)
+
+        箱宽和箱边界都取整数分（细箱数为 1/resolution 的整数倍），每个粗箱包含同样多个整数分，
+        整数分的成绩不会因箱宽为半分而在相邻箱之间分配不均、出现锯齿
+        """
+        if not self.count:
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        step = max(1, int(round(1 / self.resolution)))  # 一分包含的细箱数
+        lead = self.offset % step  # 第一个箱从整数分开始
+        size = len(self.counts) + lead
+        width = max(1, int(np.ceil(size / bins)))  # 每个粗箱包含的细箱数
+        width = -(-width // step) * step
+        counts = np.concatenate([np.zeros(lead, dtype=np.int64), self.counts, 
+                                 np.zeros(-size % width, dtype=np.int64)])
+        counts = counts.reshape(-1, width).sum(axis=1)
+        edges = (self.offset - lead + np.arange(len(counts) + 1) * width) * self.resolution
+        return counts, edges
+    
+    def density(self, cut=3):
+        """高斯核密度曲线 (x, y)，带宽按 Scott 规则，曲线延伸到数据范围外 cut 倍带宽（与 seaborn 一致）"""
+        if self.count < 2 or self.std == 0:
+            return np.zeros(0), np.zeros(0)
+        bandwidth = self.std * self.count ** (-1 / 5)
+        reach = int(np.ceil(4 * bandwidth / self.resolution))  # 核函数截断在 4 倍带宽处
+        size = len(self.counts) + 2 * reach
+        fft_size = 1 << (size - 1).bit_length()
+        
+        steps = np.arange(-reach, reach + 1) * self.resolution / bandwidth
+        kernel = np.zeros(fft_size)
+        kernel[np.arange(-reach, reach + 1) % fft_size] = np.exp(-0.5 * steps ** 2)
+        kernel /= np.sqrt(2 * np.pi) * bandwidth * self.count
+        # 循环卷积的长度不小于线性卷积的长度，结果中负下标部分在数组末尾，平移回来
+        smoothed = np.fft.irfft(np.fft.rfft(self.counts, fft_size) * np.fft.rfft(kernel), fft_size)
+        smoothed = np.roll(smoothed, reach)[:size]
+        x = (self.offset - reach + np.arange(size)) * self.resolution
+        
+        trim = reach - int(np.ceil(cut * bandwidth / self.resolution))
+        if trim > 0:
+            x, smoothed = x[trim:-trim], smoothed[trim:-trim]
+        return x, np.maximum(smoothed, 0)
+
+
+def plot_binned_histogram(ax, binned, bins, color, kde=True, alpha=0.6):
+    """用分箱计数画直方图（纵轴为人数），kde 为 True 时叠加按人数缩放的密度曲线"""
+    counts, edges = binned.histogram(bins)
+    if not len(counts):
+        return
+    ax.hist(edges[:-1], bins=edges, weights=counts, color=color, alpha=alpha, edgecolor='white')
+    if kde:
+        x, y = binned.density()
+        ax.plot(x, y * binned.count * (edges[1] - edges[0]), color=color, linewidth=2)
+
+
+def box_stats(binned, stats, label, max_fliers=200):
+    """一个科目箱线图的统计量（Axes.bxp 的输入）
+
+    四分位数取自统计结果，须线端点和异常值由分箱计数得到，不再对原始分数排序。异常值每个不同的分数只画一个点，
+    最多保留离箱体最远的 max_fliers 个，绘图开销与人数无关
+    """
+    q1, median, q3 = stats["25%分位数"], stats["中位数"], stats["75%分位数"]
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    points = binned.points[binned.counts > 0]
+    inside = points[(points >= low) & (points <= high)]
+    fliers = points[(points < low) | (points > high)]
+    if len(fliers) > max_fliers:
+        fliers = fliers[np.argsort(-np.maximum(q1 - fliers, fliers - q3), kind="stable")[:max_fliers]]
+    return {"label": label, "q1": q1, "med": median, "q3": q3, "mean": stats["平均分"], 
+            "whislo": inside.min() if len(inside) else q1, "whishi": inside.max() if len(inside) else q3, 
+            "fliers": fliers}
+
+
+def pair_histogram(x, y, x_binned, y_binned, bins=40):
+    """两列分数的二维直方图，返回 (计数矩阵[y 箱, x 箱], x 箱边界, y 箱边界)
+
+    箱边界与 BinnedScores.histogram(bins) 相同：箱宽和边界都是整数分，每个箱包含同样多个整数分，
+    整数分的成绩不会在相邻箱之间分配不均而出现条纹；只使用两列同时有值的行
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    indexes, all_edges = [], []
+    for values, binned in ((x[valid], x_binned), (y[valid], y_binned)):
+        _, edges = binned.histogram(bins)
+        if len(edges) < 2:
+            return np.zeros((0, 0), dtype=np.int64), edges, edges
+        index = np.floor((values - edges[0]) / (edges[1] - edges[0])).astype(np.int64)
+        indexes.append(np.clip(index, 0, len(edges) - 2))
+        all_edges.append(edges)
+    x_edges, y_edges = all_edges
+    size = (len(y_edges) - 1) * (len(x_edges) - 1)
+    counts = np.bincount(indexes[1] * (len(x_edges) - 1) + indexes[0], minlength=size)
+    return counts.reshape(len(y_edges) - 1, len(x_edges) - 1), x_edges, y_edges
+
+
+class ScoreLookup:
+    """一个科目（或总分）的百分位和分数段查找表
+
+    由 BinnedScores 的细箱计数预先算好每个箱之前的累计人数。查询时分数换算成箱编号后直接取表，
+    每个分数的查找时间与数据量无关。百分位为“低于该分数的人数 + 同分人数的一半”占总人数的百分比
+    """
+    def __init__(self, binned, full_mark):
+        self.resolution = binned.resolution
+        self.offset = binned.offset
+        self.counts = binned.counts
+        self.below = np.concatenate([[0], np.cumsum(self.counts)])  # below[i] 为前 i 个箱的人数
+        self.count = binned.count
+        self.full_mark = full_mark
+        self.edges, self.labels = score_bands(full_mark)
+        self.band_counts = np.bincount(self.band_index(binned.points), weights=self.counts, 
+                                       minlength=len(self.labels)).astype(np.int64)
+    
+    def percentile(self, scores):
+        """分数的百分位（0-100）；scores 为一列分数时返回同样长度的数组，缺失值为 NaN"""
+        scores = np.asarray(scores, dtype=np.float64)
+        valid = ~np.isnan(scores)
+        if self.count == 0:
+            result = np.full(scores.shape, np.nan)
+        else:
+            bins = np.floor(np.where(valid, scores, 0) / self.resolution).astype(np.int64) - self.offset
+            below = self.below[np.clip(bins, 0, len(self.counts))]
+            equal = np.where((bins >= 0) & (bins < len(self.counts)), 
+                             self.counts[np.clip(bins, 0, len(self.counts) - 1)], 0)
+            result = np.where(valid, (below + equal / 2) / self.count * 100, np.nan)
+        return result if result.ndim else float(result)
+    
+    def band_index(self, scores):
+        """分数所在分数段的编号（0 为不及格段），缺失值为 -1"""
+        scores = np.asarray(scores, dtype=np.float64)
+        index = np.searchsorted(self.edges[1:-1], scores, side="right")
+        return np.where(np.isnan(scores), -1, index)
+    
+    def band(self, scores):
+        """分数所在分数段的标签；scores 为一列分数时返回同样长度的标签数组，缺失值为 None"""
+        index = self.band_index(scores)
+        labels = np.array(self.labels + [None], dtype=object)
+        return labels[index]
+    
+    def band_shares(self):
+        """各分数段人数占比（%）"""
+        return pd.Series(self.band_counts / max(self.count, 1) * 100, index=self.labels)
+
+
+def set_cell(data, position, column, value):
+    """修改 data 第 position 行 column 列的值；整数列放不下该值（非整数或超出范围）时先转为浮点列"""
+    dtype = data[column].dtype
+    if pd.api.types.is_integer_dtype(dtype):
+        info = np.iinfo(dtype)
+        if pd.isna(value) or value != int(value) or not info.min <= value <= info.max:
+            data[column] = data[column].astype(np.float64)
+    data.iloc[position, data.columns.get_loc(column)] = value
+
+
+def append_rows(data, rows):
+    """返回在 data 末尾追加 rows 后的新数据，rows 的列按 data 对齐；分类列合并类别后仍为分类列"""
+    rows = rows.reindex(columns=data.columns)
+    columns = {}
+    for column in data.columns:
+        left, right = data[column], rows[column]
+        if isinstance(left.dtype, pd.CategoricalDtype):
+            # 新类别追加在原类别之后，原有数据的类别编码不变
+            new_categories = pd.Index(right.dropna().unique()).difference(left.cat.categories)
+            left = left.cat.add_categories(new_categories)
+            right = pd.Series(pd.Categorical(right, categories=left.cat.categories), index=right.index)
+        columns[column] = pd.concat([left, right], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def top_k_positions(values, k):
+    """返回 values 中最大的 k 个值的位置（从大到小），用 argpartition 部分选择而不是整体排序"""
+    values = np.asarray(values, dtype=np.float64)
+    values = np.where(np.isnan(values), -np.inf, values)
+    k = min(k, len(values))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates = np.argpartition(-values, k - 1)[:k] if k < len(values) else np.arange(len(values))
+    # 只对选出的 k 个排序；总分相同时按行位置先后
+    return candidates[np.lexsort((candidates, -values[candidates]))]
+
+
+class RankingEngine:
+    """总分排名引擎：维护全体和各班级按总分有序的行位置，支持增量更新
+
+    排名为“总分高于自己的人数 + 1”（并列取最小名次，与 rank(method="min") 一致）。修改单个学生的总分时
+    只调整有序数组中的一个元素，并只更新总分介于新旧值之间的学生的名次；追加学生时把新总分归并进有序数组，
+    都不需要对全部数据重新排序。缺失的总分视为最低
+    """
+    def __init__(self, totals, classes=None):
+        totals = np.asarray(totals, dtype=np.float64)
+        self.totals = np.where(np.isnan(totals), -np.inf, totals)
+        self.order = np.argsort(self.totals, kind="stable")  # 按总分升序的行位置
+        self.sorted_totals = self.totals[self.order]
+        # 按有序数组查找名次（查询本身有序，比逐行随机查找快得多）再放回各行
+        self.ranks = np.empty(len(self.totals), dtype=np.int64)
+        self.ranks[self.order] = self.rank_of(self.sorted_totals, self.sorted_totals)
+        
+        self.class_codes = None
+        self.class_labels = []
+        self.groups = {}
+        self.class_ranks = None
+        if classes is not None:
+            classes = pd.Series(classes)
+            if isinstance(classes.dtype, pd.CategoricalDtype):
+                codes, uniques = classes.cat.codes.to_numpy(), classes.cat.categories
+            else:
+                codes, uniques = pd.factorize(classes, sort=True)
+            self.class_codes = codes.astype(np.int64)
+            self.class_labels = list(uniques)
+            self.class_ranks = np.zeros(len(self.totals), dtype=np.int64)
+            # 总分升序的行位置再按班级稳定排序，每个班级内部仍按总分升序
+            by_class = self.order[np.argsort(self.class_codes[self.order], kind="stable")]
+            counts = np.bincount(self.class_codes[self.class_codes >= 0], minlength=len(self.class_labels))
+            start = int((self.class_codes < 0).sum())
+            for code, count in enumerate(counts):
+                order = by_class[start:start + count]
+                start += count
+                self.set_group(code, order, self.totals[order])
+    
+    @staticmethod
+    def rank_of(sorted_totals, totals):
+        """在升序数组 sorted_totals 中，总分为 totals 的名次"""
+        return len(sorted_totals) - np.searchsorted(sorted_totals, totals, side="right") + 1
+    
+    def set_group(self, code, order, sorted_totals):
+        """保存班级的有序数组，并计算该班级全部学生的班级名次"""
+        self.groups[code] = (order, sorted_totals)
+        self.class_ranks[order] = self.rank_of(sorted_totals, sorted_totals)
+    
+    @staticmethod
+    def move(order, sorted_totals, ranks, row, old, new):
+        """把 row 的总分从 old 改为 new：在有序数组中原地平移新旧位置之间的元素，并增量更新名次"""
+        low = np.searchsorted(sorted_totals, old, side="left")
+        high = np.searchsorted(sorted_totals, old, side="right")
+        index = low + int(np.flatnonzero(order[low:high] == row)[0])
+        
+        if new > old:
+            # 总分在 [old, new) 之间的其他学生名次后移一位，row 移到这些学生之后
+            stop = np.searchsorted(sorted_totals, new, side="left")
+            ranks[order[low:stop]] += 1
+            target = np.searchsorted(sorted_totals, new, side="right") - 1
+            order[index:target] = order[index + 1:target + 1]
+            sorted_totals[index:target] = sorted_totals[index + 1:target + 1]
+        else:
+            # 总分在 [new, old) 之间的学生名次前移一位，row 移到这些学生之前
+            start = np.searchsorted(sorted_totals, new, side="left")
+            ranks[order[start:low]] -= 1
+            target = np.searchsorted(sorted_totals, new, side="right")
+            order[target + 1:index + 1] = order[target:index]
+            sorted_totals[target + 1:index + 1] = sorted_totals[target:index]
+        order[target] = row
+        sorted_totals[target] = new
+        ranks[row] = len(sorted_totals) - np.searchsorted(sorted_totals, new, side="right") + 1
+    
+    def update(self, row, total):
+        """修改第 row 行学生的总分"""
+        old = self.totals[row]
+        new = -np.inf if np.isnan(total) else float(total)
+        if new == old:
+            return
+        self.move(self.order, self.sorted_totals, self.ranks, row, old, new)
+        if self.class_codes is not None and self.class_codes[row] >= 0:
+            self.move(*self.groups[self.class_codes[row]], self.class_ranks, row, old, new)
+        self.totals[row] = new
+    
+    @classmethod
+    def merge(cls, order, sorted_totals, ranks, new_rows, new_totals):
+        """把新学生归并进有序数组：原有学生的名次加上新学生中总分更高的人数，返回新的 (order, sorted_totals)"""
+        new_order = np.argsort(new_totals, kind="stable")
+        new_sorted = new_totals[new_order]
+        ranks[order] += len(new_sorted) - np.searchsorted(new_sorted, sorted_totals, side="right")
+        positions = np.searchsorted(sorted_totals, new_sorted, side="right")
+        order = np.insert(order, positions, new_rows[new_order])
+        sorted_totals = np.insert(sorted_totals, positions, new_sorted)
+        ranks[new_rows] = cls.rank_of(sorted_totals, new_totals)
+        return order, sorted_totals
+    
+    def append(self, totals, classes=None):
+        """在末尾追加一批学生"""
+        totals = np.asarray(totals, dtype=np.float64)
+        totals = np.where(np.isnan(totals), -np.inf, totals)
+        start = len(self.totals)
+        new_rows = np.arange(start, start + len(totals))
+        self.totals = np.concatenate([self.totals, totals])
+        self.ranks = np.concatenate([self.ranks, np.zeros(len(totals), dtype=np.int64)])
+        self.order, self.sorted_totals = self.merge(self.order, self.sorted_totals, self.ranks, new_rows, totals)
+        
+        if self.class_codes is None:
+            return
+        codes = np.full(len(totals), -1, dtype=np.int64)
+        if classes is not None:
+            label_codes = {label: code for code, label in enumerate(self.class_labels)}
+            for i, label in enumerate(pd.Series(classes)):
+                if pd.isna(label):
+                    continue
+                if label not in label_codes:
+                    label_codes[label] = len(self.class_labels)
+                    self.class_labels.append(label)
+                codes[i] = label_codes[label]
+        self.class_codes = np.concatenate([self.class_codes, codes])
+        self.class_ranks = np.concatenate([self.class_ranks, np.zeros(len(totals), dtype=np.int64)])
+        for code in np.unique(codes[codes >= 0]):
+            selected = new_rows[codes == code]
+            if code in self.groups:
+                self.groups[code] = self.merge(*self.groups[code], self.class_ranks, selected, self.totals[selected])
+            else:
+                order = selected[np.argsort(self.totals[selected], kind="stable")]
+                self.set_group(code, order, self.totals[order])
+
+
+class AnalysisCache:
+    """分析结果缓存
+
+    以数据版本、分析类型和参数为键保存计算结果。数据被替换或修改时调用 invalidate 使版本号加一，
+    旧版本的结果随之失效；数据不变时重复分析、导出都直接返回缓存的结果
+    """
+    def __init__(self):
+        self.version = 0
+        self.results = {}
+    
+    def invalidate(self):
+        """数据已变化，丢弃所有缓存结果"""
+        self.version += 1
+        self.results.clear()
+    
+    def get(self, kind, params, compute):
+        """返回 (kind, params) 对应的结果，没有缓存时调用 compute() 计算并保存"""
+        key = (self.version, kind, params)
+        if key not in self.results:
+            self.results[key] = compute()
+        return self.results[key]
 
 
 class StudentGradeAnalysisSystem:
+    # 班级分析的对比图表：(标题, 立方体指标, 纵轴标签)
+    CLASS_CHARTS = [("各班级平均分对比", "平均分", "平均分"), ("各班级及格率对比", "及格率", "及格率(%)")]
+    
     def __init__(self, root):
         self.root = root
         self.root.title("基于Python的简易学生成绩分析系统")
@@ -430,20 +2876,172 @@ class StudentGradeAnalysisSystem:
         self.root.minsize(1000, 700)
         
         # 数据存储
+        self.analysis_cache = AnalysisCache()
         self.data = None
         self.analysis_results = None
         self.current_file = None
+        self.import_dialog = None
+        self.chart_view = None
+        self.figure_manager = FigureManager(on_change=self.show_figure_count)
+        self.chart_cache = ChartRenderCache()
         
         # 创建数据生成器实例
-        self.data_generator = StudentDataGenerator(self.root)
+        self.data_generator = StudentDataGenerator(self.root, on_append=self.append_data)
         
         # 创建主界面
         self.create_widgets()
+    
+    @property
+    def data(self):
+        """当前分析的成绩数据"""
+        return self._data
+    
+    @data.setter
+    def data(self, value):
+        # 替换数据后，之前的分析结果全部失效
+        self._data = value
+        self.analysis_results = None
+        self.ranking = None
+        self.analysis_cache.invalidate()
+    
+    def touch_data(self):
+        """原地修改 self.data（如添加总分、排名列）后调用，使缓存的分析结果失效"""
+        self.analysis_cache.invalidate()
+    
+    def get_ranking(self):
+        """返回总分排名引擎；它随数据修改增量更新，因此不放在分析缓存中"""
+        if self.ranking is None and "总分" in self.data.columns:
+            classes = self.data["班级"] if "班级" in self.data.columns else None
+            self.ranking = RankingEngine(self.data["总分"].to_numpy(dtype=np.float64, na_value=np.nan), classes)
+        return self.ranking
+    
+    def write_ranks(self):
+        """把排名引擎中的全体排名和班级排名写回数据"""
+        ranking = self.get_ranking()
+        if ranking is None:
+            return
+        if "排名" in self.data.columns:
+            self.data["排名"] = ranking.ranks.copy()
+        if "班级排名" in self.data.columns and ranking.class_ranks is not None:
+            self.data["班级排名"] = ranking.class_ranks.copy()
+    
+    def get_data_fingerprint(self):
+        """返回当前数据的内容指纹（图表渲染缓存的键），每个数据版本只计算一次"""
+        return self.analysis_cache.get("fingerprint", (), lambda: data_fingerprint(self.data))
+    
+    def get_schema(self):
+        """返回当前数据的列分类，每个数据版本只推断一次"""
+        return self.analysis_cache.get("schema", (), lambda: DataSchema.infer(self.data))
+    
+    def analysis_workers(self):
+        """统计分析使用的进程数：数据量达到 PARALLEL_ANALYSIS_ROWS 时使用全部CPU核心"""
+        if self.data is None or len(self.data) < PARALLEL_ANALYSIS_ROWS:
+            return 1
+        return os.cpu_count() or 1
+    
+    def get_aggregates(self):
+        """返回科目列（及总分）的并行部分聚合结果 (聚合结果, 列名)，数据未变化时直接使用缓存"""
+        schema = self.get_schema()
+        
+        def compute():
+            subjects = schema.subjects
+            columns = subjects + (["总分"] if "总分" in self.data.columns else [])
+            # 各科目的及格分和优秀分（总分不统计达线人数），各分片精确计数
+            padding = [np.nan] * (len(columns) - len(subjects))
+            thresholds = np.array([[schema.pass_line(s) for s in subjects] + padding, 
+                                   [schema.excellent_line(s) for s in subjects] + padding], dtype=np.float64)
+            return compute_aggregates(self.data, columns, self.analysis_workers(), thresholds), columns
+        return self.analysis_cache.get("aggregates", (), compute)
+    
+    def get_comoments(self):
+        """返回科目列两两的协矩（相关系数和趋势线共用），每个数据版本只计算一次"""
+        if self.analysis_workers() > 1:
+            aggregates, columns = self.get_aggregates()
+            return aggregates.comoments(columns)
+        schema = self.get_schema()
+        return self.analysis_cache.get("comoments", (), lambda: CoMoments.from_data(self.data, schema.subjects))
+    
+    def get_class_index(self):
+        """返回班级索引，没有班级列时返回 None"""
+        if "班级" not in self.data.columns:
+            return None
+        return self.analysis_cache.get("class_index", (), lambda: ClassIndex(self.data["班级"]))
+    
+    def get_class_cube(self):
+        """返回 班级 × 科目 统计立方体，没有班级列时返回 None"""
+        class_index = self.get_class_index()
+        if class_index is None:
+            return None
+        schema = self.get_schema()
+        
+        def compute():
+            subjects = schema.subjects
+            return ClassStatsCube.build(self.data, class_index, subjects, 
+                                        [schema.pass_line(s) for s in subjects], 
+                                        [schema.excellent_line(s) for s in subjects])
+        return self.analysis_cache.get("class_cube", (), compute)
+    
+    def get_score_bins(self, column):
+        """返回一列分数的分箱计数，每个数据版本每列只对原始数据分箱一次"""
+        return self.analysis_cache.get(
+            "score_bins", column, 
+            lambda: BinnedScores(self.data[column].to_numpy(dtype=np.float64, na_value=np.nan)))
+    
+    def get_pair_histogram(self, x, y):
+        """返回两列分数的二维直方图（散点图矩阵的大数据模式），每个数据版本每对列只计算一次"""
+        return self.analysis_cache.get(
+            "pair_histogram", (x, y), 
+            lambda: pair_histogram(self.data[x].to_numpy(dtype=np.float64, na_value=np.nan), 
+                                   self.data[y].to_numpy(dtype=np.float64, na_value=np.nan), 
+                                   self.get_score_bins(x), self.get_score_bins(y)))
+    
+    def get_score_lookup(self, column):
+        """返回科目或总分的百分位和分数段查找表，每个数据版本每列只构造一次"""
+        schema = self.get_schema()
+        
+        def compute():
+            if column == "总分":
+                full_mark = sum(schema.full_marks[subject] for subject in schema.subjects)
+            else:
+                full_mark = schema.full_marks[column]
+            return ScoreLookup(self.get_score_bins(column), full_mark)
+        return self.analysis_cache.get("score_lookup", column, compute)
+    
+    def get_stats_report(self):
+        """返回各科目的统计结果，数据未变化时直接使用缓存"""
+        schema = self.get_schema()
+        
+        def compute():
+            subjects = schema.subjects
+            pass_line = [schema.pass_line(s) for s in subjects]
+            excellent_line = [schema.excellent_line(s) for s in subjects]
+            if self.analysis_workers() <= 1:
+                return StatsEngine(pass_line, excellent_line).compute(self.data, subjects)
+            
+            # 大数据量时由各进程的部分聚合合并得到统计结果
+            aggregates, columns = self.get_aggregates()
+            top_students = None
+            if "总分" in self.data.columns:
+                top_columns = [col for col in ["学号", "姓名", "班级", "总分", "排名"] if col in self.data.columns]
+                top_students = self.data.iloc[top_k_positions(self.data["总分"], 10)][top_columns]
+            student_count = self.data["姓名"].nunique() if "姓名" in self.data.columns else None
+            return aggregates.report(columns, subjects, pass_line, excellent_line, student_count, top_students)
+        return self.analysis_cache.get("stats", (), compute)
         
     def create_widgets(self):
         # 创建菜单栏
         self.create_menu()
         
+        # 状态栏（位于窗口最底部）
+        status_bar = ttk.Frame(self.root)
+        status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+        self.status_var = tk.StringVar(value="就绪")
+        self.figure_count_var = tk.StringVar(value="图表: 0")
+        ttk.Label(status_bar, textvariable=self.figure_count_var, relief=tk.SUNKEN, padding=(5, 2)).pack(
+            side=tk.RIGHT)
+        ttk.Label(status_bar, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W, padding=(5, 2)).pack(
+            fill=tk.X, side=tk.LEFT, expand=True)
+        
         # 先创建分析按钮区域（放在顶部）
         analysis_frame = ttk.Frame(self.root, padding="10")
         analysis_frame.pack(fill=tk.X, side=tk.BOTTOM)
@@ -473,6 +3071,12 @@ class StudentGradeAnalysisSystem:
             command=self.perform_advanced_analysis
         ).pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(
+            analysis_frame, 
+            text="班级分析", 
+            command=self.perform_class_analysis
+        ).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(
             analysis_frame, 
             text="导出分析结果", 
@@ -496,26 +3100,47 @@ class StudentGradeAnalysisSystem:
         left_frame.config(width=600)  # 设置固定宽度为600像素
         left_frame.pack_propagate(False)  # 防止子组件改变父组件大小
         
-        # 创建数据表格
-        table_frame = ttk.Frame(left_frame)
-        table_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # 滚动条
-        scrollbar_x = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL)
-        scrollbar_y = ttk.Scrollbar(table_frame, orient=tk.VERTICAL)
-        
-        # 树状表格
-        self.tree = ttk.Treeview(
-            table_frame,
-            yscrollcommand=scrollbar_y.set,
-            xscrollcommand=scrollbar_x.set
-        )
-        scrollbar_x.config(command=self.tree.xview)
-        scrollbar_y.config(command=self.tree.yview)
-        
-        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
-        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        # 筛选栏
+        filter_frame = ttk.Frame(left_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Label(filter_frame, text="班级:").grid(row=0, column=0, sticky=tk.W)
+        self.filter_class = tk.StringVar(value="全部")
+        self.filter_class_box = ttk.Combobox(filter_frame, textvariable=self.filter_class, 
+                                             values=["全部"], width=8, state="readonly")
+        self.filter_class_box.grid(row=0, column=1, padx=(0, 5))
+        
+        ttk.Label(filter_frame, text="姓名:").grid(row=0, column=2, sticky=tk.W)
+        self.filter_name = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.filter_name, width=8).grid(row=0, column=3, padx=(0, 5))
+        
+        ttk.Button(filter_frame, text="筛选", command=self.apply_filters, width=6).grid(row=0, column=4, padx=2)
+        ttk.Button(filter_frame, text="清除", command=self.clear_filters, width=6).grid(row=0, column=5, padx=2)
+        
+        ttk.Label(filter_frame, text="分数列:").grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        self.filter_column = tk.StringVar()
+        self.filter_column_box = ttk.Combobox(filter_frame, textvariable=self.filter_column, 
+                                              width=8, state="readonly")
+        self.filter_column_box.grid(row=1, column=1, padx=(0, 5), pady=(5, 0))
+        
+        ttk.Label(filter_frame, text="分数:").grid(row=1, column=2, sticky=tk.W, pady=(5, 0))
+        range_frame = ttk.Frame(filter_frame)
+        range_frame.grid(row=1, column=3, columnspan=2, sticky=tk.W, pady=(5, 0))
+        self.filter_min = tk.StringVar()
+        self.filter_max = tk.StringVar()
+        ttk.Entry(range_frame, textvariable=self.filter_min, width=5).pack(side=tk.LEFT)
+        ttk.Label(range_frame, text="-").pack(side=tk.LEFT, padx=2)
+        ttk.Entry(range_frame, textvariable=self.filter_max, width=5).pack(side=tk.LEFT)
+        
+        self.filter_status = tk.StringVar(value="")
+        ttk.Label(filter_frame, textvariable=self.filter_status).grid(row=1, column=5, sticky=tk.W, pady=(5, 0))
+        
+        # 创建数据表格（虚拟化显示，只渲染可见的行，点击列标题排序）
+        self.table = VirtualTable(left_frame)
+        self.table.pack(fill=tk.BOTH, expand=True)
+        self.table.bind("<<TableViewChanged>>", lambda e: self.update_filter_status())
+        # 双击科目成绩单元格修改成绩
+        self.table.tree.bind("<Double-1>", self.on_table_double_click)
         
         # 创建右侧面板（分析结果）- 占据剩余空间
         right_frame = ttk.LabelFrame(main_frame, text="分析结果", padding="10")
@@ -540,6 +3165,7 @@ class StudentGradeAnalysisSystem:
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="导入数据", command=self.import_data)
         file_menu.add_command(label="保存数据", command=self.save_data)
+        file_menu.add_command(label="大文件分块统计", command=self.stream_file_analysis)
         file_menu.add_separator()
         file_menu.add_command(label="退出", command=self.root.quit)
         menubar.add_cascade(label="文件", menu=file_menu)
@@ -547,6 +3173,7 @@ class StudentGradeAnalysisSystem:
         # 工具菜单
         tools_menu = tk.Menu(menubar, tearoff=0)
         tools_menu.add_command(label="学生数据生成器", command=self.open_data_generator)
+        tools_menu.add_command(label="百分位查询", command=self.open_percentile_query)
         menubar.add_cascade(label="工具", menu=tools_menu)
         
         # 帮助菜单
@@ -561,32 +3188,117 @@ class StudentGradeAnalysisSystem:
         """打开数据生成器窗口"""
         self.data_generator.show_generator_window()
     
+    def open_percentile_query(self):
+        """打开百分位查询窗口：输入科目（或总分）和分数，显示百分位和所在分数段"""
+        if self.data is None:
+            messagebox.showwarning("警告", "请先导入数据")
+            return
+        columns = self.get_schema().subjects + (["总分"] if "总分" in self.data.columns else [])
+        if not columns:
+            messagebox.showwarning("警告", "未识别到科目列")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("百分位查询")
+        window.resizable(False, False)
+        window.transient(self.root)
+        
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        column_var = tk.StringVar(value=columns[0])
+        score_var = tk.StringVar()
+        result_var = tk.StringVar()
+        ttk.Label(frame, text="科目:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(frame, textvariable=column_var, values=columns, width=12, 
+                     state="readonly").grid(row=0, column=1, sticky=tk.W, padx=5, pady=2)
+        ttk.Label(frame, text="分数:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        score_entry = ttk.Entry(frame, textvariable=score_var, width=14)
+        score_entry.grid(row=1, column=1, sticky=tk.W, padx=5, pady=2)
+        ttk.Label(frame, textvariable=result_var, justify=tk.LEFT).grid(row=3, column=0, columnspan=2, 
+                                                                        sticky=tk.W, pady=(8, 0))
+        
+        def query(event=None):
+            if self.data is None or column_var.get() not in self.data.columns:
+                result_var.set("数据已变化，请重新打开查询窗口")
+                return
+            try:
+                score = float(score_var.get())
+            except ValueError:
+                result_var.set("请输入有效的分数")
+                return
+            lookup = self.get_score_lookup(column_var.get())
+            band = lookup.band(score).replace("\n", "")
+            result_var.set(f"百分位: {lookup.percentile(score):.1f}%（共 {lookup.count} 人）\n分数段: {band}")
+        
+        ttk.Button(frame, text="查询", command=query).grid(row=2, column=1, sticky=tk.W, padx=5, pady=2)
+        score_entry.bind("<Return>", query)
+        score_entry.focus_set()
+    
     def import_data(self):
-        """导入数据文件"""
+        """导入数据文件（在后台线程中分块读取，界面保持响应）"""
+        if self.import_dialog is not None:
+            self.import_dialog.window.lift()
+            return
+        
         file_path = filedialog.askopenfilename(
             filetypes=[
                 ("Excel files", "*.xlsx;*.xls"),
                 ("CSV files", "*.csv"),
+                ("Parquet files", "*.parquet"),
+                ("All files", "*.*")
+            ]
+        )
+        
+        if not file_path:
+            return
+        
+        task = BackgroundImportTask(file_path)
+        
+        def on_import_done(status, result):
+            self.import_dialog = None
+            if status == "done":
+                self.data = result
+                self.current_file = file_path
+                self.update_table()
+                self.status_var.set(format_memory_report(self.data, task.saved_bytes))
+                source = "（从缓存加载）" if task.from_cache else ""
+                messagebox.showinfo("成功", f"数据导入成功{source}，共 {len(self.data)} 条记录")
+            elif status == "error":
+                messagebox.showerror("错误", f"导入数据失败: {result}")
+        
+        self.import_dialog = ImportProgressDialog(self.root, task, on_import_done)
+        self.import_dialog.start()
+    
+    def stream_file_analysis(self):
+        """分块读取大文件并统计，不把数据载入内存（结果显示在统计分析选项卡中）"""
+        if self.import_dialog is not None:
+            messagebox.showwarning("警告", "正在读取数据，请稍候")
+            return
+        
+        file_path = filedialog.askopenfilename(
+            filetypes=[
+                ("CSV files", "*.csv"),
+                ("Parquet files", "*.parquet"),
+                ("Excel files", "*.xlsx"),
                 ("All files", "*.*")
             ]
         )
         
         if not file_path:
             return
-            
-        try:
-            # 根据文件扩展名选择合适的读取方法
-            if file_path.endswith('.csv'):
-                self.data = pd.read_csv(file_path)
-            else:  # Excel文件
-                self.data = pd.read_excel(file_path)
-            
-            self.current_file = file_path
-            self.update_table()
-            messagebox.showinfo("成功", f"数据导入成功，共 {len(self.data)} 条记录")
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"导入数据失败: {str(e)}")
+        
+        def on_stats_done(status, result):
+            self.import_dialog = None
+            if status == "done":
+                self.show_stats_report(result)
+                self.status_var.set(f"分块统计完成: {os.path.basename(file_path)}，共 {result.record_count} 条记录")
+            elif status == "error":
+                messagebox.showerror("错误", f"统计数据失败: {result}")
+        
+        task = StreamingStatsTask(file_path)
+        self.import_dialog = ImportProgressDialog(self.root, task, on_stats_done, 
+                                                  title="大文件分块统计", action="正在统计")
+        self.import_dialog.start()
     
     def save_data(self):
         """保存数据"""
@@ -636,59 +3348,157 @@ class StudentGradeAnalysisSystem:
     
     def update_table(self):
         """更新表格数据"""
-        # 清空现有数据
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # 设置列
-        self.tree["columns"] = list(self.data.columns)
-        self.tree["show"] = "headings"
+        self.table.set_data(self.data)
+        self.update_filter_options()
+    
+    def on_table_double_click(self, event):
+        """双击表格中的科目成绩，弹出对话框修改"""
+        if self.data is None:
+            return
+        tree = self.table.tree
+        item = tree.identify_row(event.y)
+        column_id = tree.identify_column(event.x)
+        if not item or not column_id:
+            return
         
-        # 设置列名
-        for col in self.data.columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100, anchor=tk.CENTER)
+        column = self.data.columns[int(column_id[1:]) - 1]
+        if column not in self.get_schema().subjects:
+            return
+        position = self.table.row_position(item)
+        current = self.data[column].iloc[position]
+        student = self.data["姓名"].iloc[position] if "姓名" in self.data.columns else f"第{position + 1}行"
+        value = simpledialog.askfloat("修改成绩", f"{student} 的{column}成绩:", parent=self.root, minvalue=0,
+                                      initialvalue=None if pd.isna(current) else float(current))
+        if value is not None:
+            self.edit_score(position, column, value)
+    
+    def edit_score(self, position, column, value):
+        """修改一个学生的科目成绩，并增量更新总分、平均分、排名和班级排名"""
+        ranking = self.get_ranking()
+        set_cell(self.data, position, column, value)
         
-        # 填充数据
-        for idx, row in self.data.iterrows():
-            self.tree.insert("", tk.END, values=list(row))
+        subjects = self.get_schema().subjects
+        scores = pd.to_numeric(self.data[subjects].iloc[position], errors="coerce")
+        if "总分" in self.data.columns:
+            total = scores.sum()
+            set_cell(self.data, position, "总分", total)
+            if ranking is not None:
+                ranking.update(position, total)
+                self.write_ranks()
+        if "平均分" in self.data.columns:
+            set_cell(self.data, position, "平均分", scores.mean())
+        
+        self.touch_data()
+        self.table.data_changed()
+        self.status_var.set(f"已修改第 {position + 1} 行的{column}成绩")
     
-    def perform_basic_analysis(self):
-        """执行基本统计分析"""
+    def append_data(self, rows):
+        """把生成器生成的数据追加到分析数据末尾，总分、平均分和排名增量计算"""
         if self.data is None:
-            messagebox.showwarning("警告", "请先导入数据")
+            self.data = rows.copy()
+            self.update_table()
+            self.status_var.set(f"已添加 {len(rows)} 条记录，共 {len(self.data)} 条")
             return
-            
-        # 清空统计分析面板
-        for widget in self.stats_frame.winfo_children():
-            widget.destroy()
         
-        # 创建滚动文本框显示统计结果
-        text_frame = ttk.Frame(self.stats_frame)
-        text_frame.pack(fill=tk.BOTH, expand=True)
+        rows = rows.copy()
+        if "序号" in self.data.columns and "序号" in rows.columns:
+            rows["序号"] = np.arange(len(self.data) + 1, len(self.data) + len(rows) + 1)
+        subjects = self.get_schema().subjects
+        if "总分" in self.data.columns:
+            rows["总分"] = rows.reindex(columns=subjects).sum(axis=1)
+        if "平均分" in self.data.columns:
+            rows["平均分"] = rows.reindex(columns=subjects).mean(axis=1)
+        
+        ranking = self.get_ranking()
+        if ranking is not None:
+            ranking.append(rows["总分"].to_numpy(dtype=np.float64, na_value=np.nan), 
+                           rows["班级"] if "班级" in rows.columns else None)
+        # 替换数据会清空排名引擎，已增量更新的引擎需要保留
+        self.data = append_rows(self.data, rows)
+        self.ranking = ranking
+        self.write_ranks()
         
-        scrollbar = ttk.Scrollbar(text_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.update_table()
+        self.status_var.set(f"已追加 {len(rows)} 条记录，共 {len(self.data)} 条")
+    
+    def update_filter_options(self):
+        """根据当前数据刷新筛选栏的下拉选项"""
+        if self.data is None:
+            self.filter_class_box["values"] = ["全部"]
+            self.filter_column_box["values"] = []
+            return
         
-        stats_text = tk.Text(text_frame, wrap=tk.WORD, yscrollcommand=scrollbar.set, padx=10, pady=10)
-        stats_text.pack(fill=tk.BOTH, expand=True)
-        scrollbar.config(command=stats_text.yview)
+        classes = []
+        if "班级" in self.data.columns:
+            classes = sorted(str(c) for c in self.data["班级"].dropna().unique())
+        self.filter_class_box["values"] = ["全部"] + classes
+        if self.filter_class.get() not in self.filter_class_box["values"]:
+            self.filter_class.set("全部")
+        
+        numeric_columns = [str(col) for col in self.data.select_dtypes(include=[np.number]).columns]
+        self.filter_column_box["values"] = numeric_columns
+        if self.filter_column.get() not in numeric_columns:
+            self.filter_column.set("总分" if "总分" in numeric_columns else 
+                                   (numeric_columns[0] if numeric_columns else ""))
+    
+    def apply_filters(self):
+        """按筛选栏的条件筛选表格"""
+        if self.data is None:
+            return
         
-        # 基本统计信息
-        stats_text.insert(tk.END, "===== 基本统计信息 =====\n\n")
-        stats_text.insert(tk.END, f"总记录数: {len(self.data)}\n")
+        filters = []
+        class_name = self.filter_class.get()
+        if class_name and class_name != "全部" and "班级" in self.data.columns:
+            # 班级列可能是数字或分类类型，按显示的文本匹配原始取值
+            values = self.data["班级"].dropna().unique()
+            value = next((v for v in values if str(v) == class_name), class_name)
+            filters.append(("equals", "班级", value))
+        
+        name_prefix = self.filter_name.get().strip()
+        if name_prefix and "姓名" in self.data.columns:
+            filters.append(("prefix", "姓名", name_prefix))
+        
+        column = self.filter_column.get()
+        low_text, high_text = self.filter_min.get().strip(), self.filter_max.get().strip()
+        if column and (low_text or high_text):
+            try:
+                low = float(low_text) if low_text else None
+                high = float(high_text) if high_text else None
+            except ValueError:
+                messagebox.showerror("错误", "分数范围必须是数字")
+                return
+            # 下拉框显示的是字符串列名，找回数据中的原始列名
+            column = next((col for col in self.data.columns if str(col) == column), column)
+            filters.append(("range", column, low, high))
         
-        # 假设存在"姓名"列
-        if "姓名" in self.data.columns:
-            stats_text.insert(tk.END, f"学生人数: {self.data['姓名'].nunique()}\n\n")
+        self.table.set_filters(filters)
+    
+    def clear_filters(self):
+        """清除筛选条件"""
+        self.filter_class.set("全部")
+        self.filter_name.set("")
+        self.filter_min.set("")
+        self.filter_max.set("")
+        self.table.set_filters([])
+    
+    def update_filter_status(self):
+        """显示筛选后的行数"""
+        if self.table.data is None:
+            self.filter_status.set("")
+        else:
+            self.filter_status.set(f"显示 {self.table.row_count} / {self.table.total_rows} 行")
+    
+    def perform_basic_analysis(self):
+        """执行基本统计分析"""
+        if self.data is None:
+            messagebox.showwarning("警告", "请先导入数据")
+            return
         
-        # 识别科目列（假设非ID和姓名的列都是科目）
-        subject_columns = []
-        for col in self.data.columns:
-            if col not in ["序号", "学号", "姓名", "班级", "总分", "排名"]:
-                subject_columns.append(col)
+        # 识别科目列（数值列中除编号列和总分、平均分、排名等计算列以外的列）
+        subject_columns = self.get_schema().subjects
         
         # 计算总分（如果不存在）
+        column_count = len(self.data.columns)
         if "总分" not in self.data.columns and subject_columns:
             self.data["总分"] = self.data[subject_columns].sum(axis=1)
         
@@ -696,47 +3506,45 @@ class StudentGradeAnalysisSystem:
         if "平均分" not in self.data.columns and subject_columns:
             self.data["平均分"] = self.data[subject_columns].mean(axis=1)
         
-        # 计算排名（如果不存在）
+        # 计算排名和班级排名（如果不存在）
         if "排名" not in self.data.columns and "总分" in self.data.columns:
-            self.data["排名"] = self.data["总分"].rank(ascending=False, method="min").astype(int)
+            self.data["排名"] = 0
+            if "班级" in self.data.columns:
+                self.data["班级排名"] = 0
+            self.write_ranks()
+        
+        # 添加了新列时，之前缓存的分析结果失效
+        if len(self.data.columns) != column_count:
+            self.touch_data()
+            self.update_table()
         
-        # 更新表格
-        self.update_table()
+        # 一次计算所有科目的统计指标，界面、导出和报告共用同一个结果
+        report = self.get_stats_report()
+        self.show_stats_report(report)
         
-        # 科目统计
-        stats_text.insert(tk.END, "===== 各科目统计 =====\n\n")
-        for subject in subject_columns:
-            stats_text.insert(tk.END, f"{subject}:\n")
-            stats_text.insert(tk.END, f"  平均分: {self.data[subject].mean():.2f}\n")
-            stats_text.insert(tk.END, f"  最高分: {self.data[subject].max()}\n")
-            stats_text.insert(tk.END, f"  最低分: {self.data[subject].min()}\n")
-            stats_text.insert(tk.END, f"  及格率: {((self.data[subject] >= 60).sum() / len(self.data) * 100):.2f}%\n")
-            stats_text.insert(tk.END, f"  优秀率(>=90): {((self.data[subject] >= 90).sum() / len(self.data) * 100):.2f}%\n\n")
-        
-        # 总分统计
-        if "总分" in self.data.columns:
-            stats_text.insert(tk.END, "===== 总分统计 =====\n\n")
-            stats_text.insert(tk.END, f"  平均分: {self.data['总分'].mean():.2f}\n")
-            stats_text.insert(tk.END, f"  最高分: {self.data['总分'].max()}\n")
-            stats_text.insert(tk.END, f"  最低分: {self.data['总分'].min()}\n\n")
-        
-        # 添加更多统计功能
-        stats_text.insert(tk.END, "===== 各科目详细统计 =====\n\n")
-        for subject in subject_columns:
-            stats_text.insert(tk.END, f"{subject}:")
-            stats_text.insert(tk.END, f"\n  平均分: {self.data[subject].mean():.2f}")
-            stats_text.insert(tk.END, f"\n  中位数: {self.data[subject].median():.2f}")
-            stats_text.insert(tk.END, f"\n  标准差: {self.data[subject].std():.2f}")
-            stats_text.insert(tk.END, f"\n  最小值: {self.data[subject].min()}")
-            stats_text.insert(tk.END, f"\n  最大值: {self.data[subject].max()}")
-            stats_text.insert(tk.END, f"\n  25%分位数: {self.data[subject].quantile(0.25):.2f}")
-            stats_text.insert(tk.END, f"\n  75%分位数: {self.data[subject].quantile(0.75):.2f}\n\n")
-        
-        # 保存分析结果
+        # 保存分析结果（统计数据本身在缓存中，导出和报告时按当前数据版本获取）
         self.analysis_results = {
-            "basic_stats": self.data.describe(),
-            "subject_columns": subject_columns
+            "subject_columns": report.subjects
         }
+    
+    def show_stats_report(self, report):
+        """在统计分析选项卡中显示统计结果"""
+        # 清空统计分析面板
+        for widget in self.stats_frame.winfo_children():
+            widget.destroy()
+        
+        # 创建滚动文本框显示统计结果
+        text_frame = ttk.Frame(self.stats_frame)
+        text_frame.pack(fill=tk.BOTH, expand=True)
+        
+        scrollbar = ttk.Scrollbar(text_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        stats_text = tk.Text(text_frame, wrap=tk.WORD, yscrollcommand=scrollbar.set, padx=10, pady=10)
+        stats_text.pack(fill=tk.BOTH, expand=True)
+        scrollbar.config(command=stats_text.yview)
+        
+        stats_text.insert(tk.END, format_stats_report(report))
         
         # 禁止编辑文本框
         stats_text.config(state=tk.DISABLED)
@@ -744,6 +3552,41 @@ class StudentGradeAnalysisSystem:
         # 切换到统计分析选项卡
         self.notebook.select(self.stats_frame)
     
+    def start_chart_render(self, canvas, charts):
+        """在可视化面板中按需渲染分析图表；charts 为 (放置图表的框架, 图表尺寸, 作图函数) 列表"""
+        if self.chart_view is not None:
+            self.chart_view.close()
+        fingerprint = self.get_data_fingerprint()
+        charts = [(frame, size, build, (fingerprint,) + chart_cache_key(build)) for frame, size, build in charts]
+        self.chart_view = LazyChartView(self.root, canvas, charts, self.figure_manager, self.chart_cache)
+    
+    def show_figure_count(self, count, nbytes):
+        """在状态栏右侧显示当前存活的图表数量和估计内存"""
+        self.figure_count_var.set(f"图表: {count} ({nbytes / 1024 / 1024:.1f} MB)")
+    
+    def get_current_figures(self):
+        """当前分析的全部图表（用于导出为PDF等矢量格式）"""
+        return self.chart_view.all_figures() if self.chart_view is not None else []
+    
+    def current_chart_count(self):
+        """当前分析的图表数量"""
+        return len(self.chart_view.figures) if self.chart_view is not None else 0
+    
+    def save_chart(self, index, file_path, dpi=300):
+        """保存当前分析的第 index 个图表：PNG/JPG 使用渲染缓存，其他格式（如PDF）由 Figure 直接保存"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".png":
+            with open(file_path, "wb") as f:
+                f.write(self.chart_view.chart_png(index, dpi))
+        elif extension in (".jpg", ".jpeg"):
+            from PIL import Image
+            with Image.open(io.BytesIO(self.chart_view.chart_png(index, dpi))) as image:
+                image.convert("RGB").save(file_path, dpi=(dpi, dpi))
+        else:
+            figure = self.chart_view.all_figures()[index]
+            with MATPLOTLIB_LOCK:
+                figure.savefig(file_path, dpi=dpi, bbox_inches='tight')
+    
     def perform_subject_analysis(self):
         """执行科目对比分析"""
         if self.data is None:
@@ -755,10 +3598,7 @@ class StudentGradeAnalysisSystem:
             widget.destroy()
         
         # 识别科目列
-        subject_columns = []
-        for col in self.data.columns:
-            if col not in ["序号", "学号", "姓名", "班级", "总分", "排名"]:
-                subject_columns.append(col)
+        subject_columns = self.get_schema().subjects
         
         if not subject_columns:
             messagebox.showwarning("警告", "未识别到科目列")
@@ -783,83 +3623,75 @@ class StudentGradeAnalysisSystem:
         scrollbar_h.pack(side=tk.BOTTOM, fill=tk.X)
         scrollbar_v.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 存储所有图表以便导出
-        self.current_figures = []
         self.current_analysis_type = 'subject'  # 标记分析类型
         
         # 1. 各科目平均分对比图
         avg_frame = ttk.LabelFrame(scrollable_frame, text="各科目平均分对比", padding="10")
         avg_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        fig1, ax1 = plt.subplots(1, 1, figsize=(12, 6))
-        avg_scores = [self.data[subject].mean() for subject in subject_columns]
-        
-        # 使用更美观的颜色
-        colors = plt.cm.Set3(range(len(subject_columns)))
-        bars = ax1.bar(subject_columns, avg_scores, color=colors)
-        
-        # 添加数值标签
-        for bar, score in zip(bars, avg_scores):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
-                    f'{score:.1f}', ha='center', va='bottom', fontweight='bold')
-        
-        ax1.set_title('各科目平均分对比', fontsize=14, fontweight='bold')
-        ax1.set_ylabel('平均分')
-        ax1.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # 自动调整x轴标签角度
-        if len(subject_columns) > 5:
-            plt.setp(ax1.get_xticklabels(), rotation=45, ha='right')
-        
-        plt.tight_layout()
-        
-        # 将图表嵌入框架
-        canvas1 = FigureCanvasTkAgg(fig1, master=avg_frame)
-        canvas1.draw()
-        canvas1.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        avg_scores = self.get_stats_report().table["平均分"].tolist()
         
-        self.current_figures.append(fig1)
+        def build_average_chart(fig1):
+            ax1 = fig1.subplots()
+            
+            # 使用更美观的颜色
+            colors = plt.cm.Set3(range(len(subject_columns)))
+            bars = ax1.bar(subject_columns, avg_scores, color=colors)
+            
+            # 添加数值标签
+            for bar, score in zip(bars, avg_scores):
+                height = bar.get_height()
+                ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
+                        f'{score:.1f}', ha='center', va='bottom', fontweight='bold')
+            
+            ax1.set_title('各科目平均分对比', fontsize=14, fontweight='bold')
+            ax1.set_ylabel('平均分')
+            ax1.grid(axis='y', linestyle='--', alpha=0.7)
+            
+            # 自动调整x轴标签角度
+            if len(subject_columns) > 5:
+                plt.setp(ax1.get_xticklabels(), rotation=45, ha='right')
+            
+            fig1.tight_layout()
         
         # 2. 各科目分数分布箱线图
         box_frame = ttk.LabelFrame(scrollable_frame, text="各科目分数分布箱线图", padding="10")
         box_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        fig2, ax2 = plt.subplots(1, 1, figsize=(12, 6))
-        
-        # 准备箱线图数据
-        box_data = [self.data[subject].dropna() for subject in subject_columns]
+        # 准备箱线图统计量（四分位数来自统计结果，须线和异常值来自分箱计数）
+        report = self.get_stats_report()
+        box_data = [box_stats(self.get_score_bins(subject), report.table.loc[subject], subject) 
+                    for subject in subject_columns]
         
-        # 创建箱线图
-        box_plot = ax2.boxplot(box_data, labels=subject_columns, patch_artist=True)
-        
-        # 美化箱线图
-        colors2 = plt.cm.Pastel1(range(len(subject_columns)))
-        for patch, color in zip(box_plot['boxes'], colors2):
-            patch.set_facecolor(color)
-            patch.set_alpha(0.8)
-        
-        # 设置中位数线的颜色
-        for median in box_plot['medians']:
-            median.set_color('red')
-            median.set_linewidth(2)
-        
-        ax2.set_title('各科目分数分布箱线图', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('分数')
-        ax2.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # 自动调整x轴标签角度
-        if len(subject_columns) > 5:
-            plt.setp(ax2.get_xticklabels(), rotation=45, ha='right')
-        
-        plt.tight_layout()
-        
-        # 将图表嵌入框架
-        canvas2 = FigureCanvasTkAgg(fig2, master=box_frame)
-        canvas2.draw()
-        canvas2.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        def build_box_chart(fig2):
+            ax2 = fig2.subplots()
+            
+            # 创建箱线图
+            box_plot = ax2.bxp(box_data, patch_artist=True)
+            
+            # 美化箱线图
+            colors2 = plt.cm.Pastel1(range(len(subject_columns)))
+            for patch, color in zip(box_plot['boxes'], colors2):
+                patch.set_facecolor(color)
+                patch.set_alpha(0.8)
+            
+            # 设置中位数线的颜色
+            for median in box_plot['medians']:
+                median.set_color('red')
+                median.set_linewidth(2)
+            
+            ax2.set_title('各科目分数分布箱线图', fontsize=14, fontweight='bold')
+            ax2.set_ylabel('分数')
+            ax2.grid(axis='y', linestyle='--', alpha=0.7)
+            
+            # 自动调整x轴标签角度
+            if len(subject_columns) > 5:
+                plt.setp(ax2.get_xticklabels(), rotation=45, ha='right')
+            
+            fig2.tight_layout()
         
-        self.current_figures.append(fig2)
+        # 滚动到可见范围附近的图表才在后台线程中构造并渲染
+        self.start_chart_render(main_canvas, [(avg_frame, (12, 6), build_average_chart), (box_frame, (12, 6), build_box_chart)])
         
         # 绑定鼠标滚轮事件
         def _on_mousewheel(event):
@@ -867,10 +3699,6 @@ class StudentGradeAnalysisSystem:
         
         main_canvas.bind_all("<MouseWheel>", _on_mousewheel)
         
-        # 保存第一个图表供导出（为了兼容性）
-        if self.current_figures:
-            self.current_fig = self.current_figures[0]
-        
         # 切换到可视化选项卡
         self.notebook.select(self.visual_frame)
     
@@ -885,10 +3713,7 @@ class StudentGradeAnalysisSystem:
             widget.destroy()
         
         # 识别科目列
-        subject_columns = []
-        for col in self.data.columns:
-            if col not in ["序号", "学号", "姓名", "班级", "总分", "排名"]:
-                subject_columns.append(col)
+        subject_columns = self.get_schema().subjects
         
         if not subject_columns:
             messagebox.showwarning("警告", "未识别到科目列")
@@ -913,79 +3738,56 @@ class StudentGradeAnalysisSystem:
         scrollbar_h.pack(side=tk.BOTTOM, fill=tk.X)
         scrollbar_v.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 存储所有图表以便导出
-        self.current_figures = []
         self.current_analysis_type = 'distribution'  # 标记分析类型
+        schema = self.get_schema()
+        report = self.get_stats_report()
+        charts = []
         
         # 1. 如果有总分，先显示总分分布
         if "总分" in self.data.columns:
             total_frame = ttk.LabelFrame(scrollable_frame, text="总分分布分析", padding="10")
             total_frame.pack(fill=tk.X, padx=10, pady=5)
+            total_bins = self.get_score_bins("总分")
             
-            fig_total, ax_total = plt.subplots(1, 1, figsize=(12, 6))
-            sns.histplot(self.data["总分"], bins=15, kde=True, ax=ax_total, color='green')
-            ax_total.set_title('总分分布直方图', fontsize=14, fontweight='bold')
-            ax_total.set_xlabel('总分')
-            ax_total.set_ylabel('学生数量')
-            ax_total.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            # 添加统计信息
-            mean_score = self.data["总分"].mean()
-            max_score = self.data["总分"].max()
-            min_score = self.data["总分"].min()
-            ax_total.axvline(mean_score, color='red', linestyle='--', linewidth=2, label=f'平均分: {mean_score:.1f}')
-            ax_total.legend()
-            
-            plt.tight_layout()
-            
-            canvas_total = FigureCanvasTkAgg(fig_total, master=total_frame)
-            canvas_total.draw()
-            canvas_total.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            def build_total_chart(fig_total):
+                ax_total = fig_total.subplots()
+                plot_binned_histogram(ax_total, total_bins, 15, 'green')
+                ax_total.set_title('总分分布直方图', fontsize=14, fontweight='bold')
+                ax_total.set_xlabel('总分')
+                ax_total.set_ylabel('学生数量')
+                ax_total.grid(axis='y', linestyle='--', alpha=0.7)
+                
+                # 添加统计信息
+                mean_score = report.total["平均分"]
+                ax_total.axvline(mean_score, color='red', linestyle='--', linewidth=2, label=f'平均分: {mean_score:.1f}')
+                ax_total.legend()
+                
+                fig_total.tight_layout()
             
-            self.current_figures.append(fig_total)
+            charts.append((total_frame, (12, 6), build_total_chart))
         
         # 2. 为每个科目创建独立的分析图表
         colors = sns.color_palette('Set2', n_colors=len(subject_columns))
         
-        for i, subject in enumerate(subject_columns):
-            # 为每个科目创建独立的框架
-            subject_frame = ttk.LabelFrame(scrollable_frame, text=f"{subject} 分析", padding="10")
-            subject_frame.pack(fill=tk.X, padx=10, pady=5)
-            
-            # 创建包含两个子图的图表：直方图和饼图
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+        def build_subject_chart(subject, color, bins, range_counts, fig):
+            # 包含两个子图的图表：直方图和饼图
+            ax1, ax2 = fig.subplots(1, 2)
             
             # 左侧：分数分布直方图
-            sns.histplot(self.data[subject], bins=12, kde=True, ax=ax1, color=colors[i])
+            plot_binned_histogram(ax1, bins, 12, color)
             ax1.set_title(f'{subject} 分数分布直方图', fontsize=12, fontweight='bold')
             ax1.set_xlabel('分数')
             ax1.set_ylabel('学生数量')
             ax1.grid(axis='y', linestyle='--', alpha=0.7)
             
             # 添加统计信息到直方图
-            mean_score = self.data[subject].mean()
-            pass_score = 60 if self.data[subject].max() <= 100 else 90
+            mean_score = report.table.loc[subject, "平均分"]
+            pass_score = schema.pass_line(subject)
             ax1.axvline(mean_score, color='red', linestyle='--', linewidth=2, label=f'平均分: {mean_score:.1f}')
-            ax1.axvline(pass_score, color='orange', linestyle='--', linewidth=2, label=f'及格线: {pass_score}')
+            ax1.axvline(pass_score, color='orange', linestyle='--', linewidth=2, label=f'及格线: {pass_score:g}')
             ax1.legend()
             
-            # 右侧：分数段占比饼图
-            subject_max = self.data[subject].max()
-            if subject_max <= 100:
-                bins = [0, 60, 70, 80, 90, 100]
-                labels = ['不及格\n(0-59)', '及格\n(60-69)', '中等\n(70-79)', '良好\n(80-89)', '优秀\n(90-100)']
-            elif subject_max <= 150:
-                bins = [0, 90, 105, 120, 135, 150]
-                labels = ['不及格\n(0-89)', '及格\n(90-104)', '中等\n(105-119)', '良好\n(120-134)', '优秀\n(135-150)']
-            else:
-                # 对于其他满分制，使用百分比分段
-                bins = [0, subject_max*0.6, subject_max*0.7, subject_max*0.8, subject_max*0.9, subject_max]
-                labels = ['不及格', '及格', '中等', '良好', '优秀']
-            
-            score_ranges = pd.cut(self.data[subject], bins=bins, labels=labels, include_lowest=True)
-            range_counts = score_ranges.value_counts(normalize=True).reindex(labels) * 100
-            
-            # 过滤掉为0的分段
+            # 右侧：分数段占比饼图，过滤掉为0的分段
             non_zero_counts = range_counts[range_counts > 0]
             non_zero_labels = non_zero_counts.index.tolist()
             
@@ -1003,14 +3805,19 @@ class StudentGradeAnalysisSystem:
             
             ax2.set_title(f'{subject} 各分数段占比', fontsize=12, fontweight='bold')
             
-            plt.tight_layout()
-            
-            # 将图表嵌入框架
-            canvas = FigureCanvasTkAgg(fig, master=subject_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            fig.tight_layout()
+        
+        for i, subject in enumerate(subject_columns):
+            # 为每个科目创建独立的框架
+            subject_frame = ttk.LabelFrame(scrollable_frame, text=f"{subject} 分析", padding="10")
+            subject_frame.pack(fill=tk.X, padx=10, pady=5)
             
-            self.current_figures.append(fig)
+            # 分箱计数和分数段占比（来自缓存的分数段查找表）在界面线程中取出，后台线程只负责画图
+            charts.append((subject_frame, (14, 6), partial(build_subject_chart, subject, colors[i], self.get_score_bins(subject), 
+                                                           self.get_score_lookup(subject).band_shares())))
+        
+        # 滚动到可见范围附近的图表才在后台线程中构造并渲染
+        self.start_chart_render(main_canvas, charts)
         
         # 绑定鼠标滚轮事件
         def _on_mousewheel(event):
@@ -1018,9 +3825,107 @@ class StudentGradeAnalysisSystem:
         
         main_canvas.bind_all("<MouseWheel>", _on_mousewheel)
         
-        # 保存第一个图表供导出（为了兼容性）
-        if self.current_figures:
-            self.current_fig = self.current_figures[0]
+        # 切换到可视化选项卡
+        self.notebook.select(self.visual_frame)
+    
+    def perform_class_analysis(self):
+        """执行班级分析：单个班级的各科目统计和班级间对比图表"""
+        if self.data is None:
+            messagebox.showwarning("警告", "请先导入数据")
+            return
+        
+        cube = self.get_class_cube()
+        if cube is None or not cube.labels:
+            messagebox.showwarning("警告", "数据中没有班级信息")
+            return
+        if not cube.subjects:
+            messagebox.showwarning("警告", "未识别到科目列")
+            return
+        
+        # 清空可视化面板
+        for widget in self.visual_frame.winfo_children():
+            widget.destroy()
+        
+        # 创建一个主框架用于放置所有图表
+        main_canvas = tk.Canvas(self.visual_frame)
+        scrollbar_v = ttk.Scrollbar(self.visual_frame, orient="vertical", command=main_canvas.yview)
+        scrollbar_h = ttk.Scrollbar(self.visual_frame, orient="horizontal", command=main_canvas.xview)
+        scrollable_frame = ttk.Frame(main_canvas)
+
+        scrollable_frame.bind(
+            "<Configure>",
+            lambda e: main_canvas.configure(scrollregion=main_canvas.bbox("all"))
+        )
+
+        main_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+        main_canvas.configure(yscrollcommand=scrollbar_v.set, xscrollcommand=scrollbar_h.set)
+
+        main_canvas.pack(side="top", fill="both", expand=True)
+        scrollbar_h.pack(side=tk.BOTTOM, fill=tk.X)
+        scrollbar_v.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.current_analysis_type = 'class'  # 标记分析类型
+        
+        # 1. 单个班级的各科目统计表
+        detail_frame = ttk.LabelFrame(scrollable_frame, text="班级各科目统计", padding="10")
+        detail_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        selector_frame = ttk.Frame(detail_frame)
+        selector_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(selector_frame, text="班级:").pack(side=tk.LEFT)
+        selected_class = tk.StringVar(value=str(cube.labels[0]))
+        ttk.Combobox(selector_frame, textvariable=selected_class, values=[str(label) for label in cube.labels], 
+                     width=15, state="readonly").pack(side=tk.LEFT, padx=5)
+        size_var = tk.StringVar()
+        ttk.Label(selector_frame, textvariable=size_var).pack(side=tk.LEFT, padx=10)
+        
+        columns = ["科目", "平均分", "标准差", "最低分", "25%分位数", "中位数", "75%分位数", "最高分", "及格率", "优秀率"]
+        class_tree = ttk.Treeview(detail_frame, columns=columns, show="headings", height=min(len(cube.subjects), 15))
+        for col in columns:
+            class_tree.heading(col, text=col)
+            class_tree.column(col, width=80, anchor=tk.CENTER)
+        class_tree.pack(fill=tk.X)
+        
+        def show_class(*args):
+            label = next(label for label in cube.labels if str(label) == selected_class.get())
+            table = cube.class_table(label)
+            class_tree.delete(*class_tree.get_children())
+            for subject, row in table.iterrows():
+                class_tree.insert("", tk.END, values=(
+                    subject, f"{row['平均分']:.2f}", f"{row['标准差']:.2f}", f"{row['最小值']:g}", 
+                    f"{row['25%分位数']:.2f}", f"{row['中位数']:.2f}", f"{row['75%分位数']:.2f}", 
+                    f"{row['最大值']:g}", f"{row['及格率']:.2f}%", f"{row['优秀率']:.2f}%"))
+            size_var.set(f"人数: {int(table['人数'].max())}")
+        
+        selected_class.trace_add("write", show_class)
+        show_class()
+        
+        # 2. 各班级平均分对比图、及格率对比图
+        def build_class_chart(title, metric, ylabel, fig):
+            ax = fig.subplots()
+            cube.metric(metric).plot(kind='bar', ax=ax, width=0.8)
+            ax.set_title(title, fontsize=14, fontweight='bold')
+            ax.set_ylabel(ylabel)
+            ax.set_xlabel('班级')
+            ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+            ax.grid(axis='y', linestyle='--', alpha=0.7)
+            plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+            fig.tight_layout()
+        
+        charts = []
+        for title, metric, ylabel in self.CLASS_CHARTS:
+            chart_frame = ttk.LabelFrame(scrollable_frame, text=title, padding="10")
+            chart_frame.pack(fill=tk.X, padx=10, pady=5)
+            charts.append((chart_frame, (12, 6), partial(build_class_chart, title, metric, ylabel)))
+        
+        # 滚动到可见范围附近的图表才在后台线程中构造并渲染
+        self.start_chart_render(main_canvas, charts)
+        
+        # 绑定鼠标滚轮事件
+        def _on_mousewheel(event):
+            main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        
+        main_canvas.bind_all("<MouseWheel>", _on_mousewheel)
         
         # 切换到可视化选项卡
         self.notebook.select(self.visual_frame)
@@ -1085,13 +3990,17 @@ class StudentGradeAnalysisSystem:
                         result_df = pd.DataFrame()
                         
                         # 添加基本统计
-                        stats_df = self.analysis_results["basic_stats"]
+                        report = self.get_stats_report()
+                        stats_df = report.table
+                        if report.total is not None:
+                            stats_df = pd.concat([stats_df, report.total.to_frame().T]).rename_axis("科目")
+                        result_df = stats_df.reset_index()
                         
                         # 添加总分排名前10的学生
-                        if "总分" in self.data.columns:
-                            top_students = self.data.sort_values("总分", ascending=False).head(10)
+                        top_students = report.top_students
+                        if top_students is not None:
                             result_df = pd.concat([result_df, pd.DataFrame(["", "总分排名前10的学生", ""], columns=["备注"])])
-                            result_df = pd.concat([result_df, top_students[["姓名", "总分", "排名"]]])
+                            result_df = pd.concat([result_df, top_students])
                         
                         # 保存到文件
                         if file_path.endswith('.csv'):
@@ -1099,17 +4008,18 @@ class StudentGradeAnalysisSystem:
                         else:
                             with pd.ExcelWriter(file_path) as writer:
                                 stats_df.to_excel(writer, sheet_name='统计数据')
-                                if "总分" in self.data.columns:
+                                if top_students is not None:
                                     top_students.to_excel(writer, sheet_name='前十名学生', index=False)
                 
                     except Exception as e:
                         messagebox.showerror("错误", f"导出统计数据失败: {str(e)}")
                         return
             
-            # 导出图表
-            if var_chart.get() and hasattr(self, 'current_figures'):
+            # 导出图表（已渲染过的图表直接使用渲染缓存，其余图表重新构造）
+            chart_count = self.current_chart_count() if var_chart.get() else 0
+            if chart_count:
                 # 如果有多个图表，询问用户是否要分别导出
-                if len(self.current_figures) > 1:
+                if chart_count > 1:
                     export_choice = messagebox.askyesnocancel(
                         "图表导出", 
                         "检测到多个图表。\n点击'是'分别导出每个图表\n点击'否'导出为单个文件\n点击'取消'跳过图表导出"
@@ -1121,8 +4031,10 @@ class StudentGradeAnalysisSystem:
                         base_path = filedialog.askdirectory(title="选择保存目录")
                         if base_path:
                             try:
-                                for i, fig in enumerate(self.current_figures):
-                                    if i == 0 and "总分" in self.data.columns:
+                                for i in range(chart_count):
+                                    if getattr(self, 'current_analysis_type', None) == 'class':
+                                        filename = f"{default_filename}_{self.CLASS_CHARTS[i][0]}.png"
+                                    elif i == 0 and "总分" in self.data.columns:
                                         filename = f"{default_filename}_总分分布.png"
                                     elif hasattr(self, 'current_analysis_type'):
                                         # 根据分析类型命名
@@ -1135,8 +4047,7 @@ class StudentGradeAnalysisSystem:
                                                 filename = f"{default_filename}_科目对比图表{i+1}.png"
                                         else:  # distribution analysis
                                             # 获取科目名
-                                            subject_columns = [col for col in self.data.columns 
-                                                             if col not in ["序号", "学号", "姓名", "班级", "总分", "排名"]]
+                                            subject_columns = self.get_schema().subjects
                                             subject_idx = i - (1 if "总分" in self.data.columns else 0)
                                             if subject_idx < len(subject_columns):
                                                 subject_name = subject_columns[subject_idx]
@@ -1145,8 +4056,7 @@ class StudentGradeAnalysisSystem:
                                                 filename = f"{default_filename}_图表{i+1}.png"
                                     else:
                                         # 获取科目名（兼容性处理）
-                                        subject_columns = [col for col in self.data.columns 
-                                                         if col not in ["序号", "学号", "姓名", "班级", "总分", "排名"]]
+                                        subject_columns = self.get_schema().subjects
                                         subject_idx = i - (1 if "总分" in self.data.columns else 0)
                                         if subject_idx < len(subject_columns):
                                             subject_name = subject_columns[subject_idx]
@@ -1155,9 +4065,9 @@ class StudentGradeAnalysisSystem:
                                             filename = f"{default_filename}_图表{i+1}.png"
                                     
                                     file_path = os.path.join(base_path, filename)
-                                    fig.savefig(file_path, dpi=300, bbox_inches='tight')
+                                    self.save_chart(i, file_path)
                                 
-                                messagebox.showinfo("成功", f"已导出 {len(self.current_figures)} 个图表到:\n{base_path}")
+                                messagebox.showinfo("成功", f"已导出 {chart_count} 个图表到:\n{base_path}")
                             except Exception as e:
                                 messagebox.showerror("错误", f"导出图表失败: {str(e)}")
                                 return
@@ -1180,11 +4090,12 @@ class StudentGradeAnalysisSystem:
                                 
                                 if file_path.endswith('.pdf'):
                                     with PdfPages(file_path) as pdf:
-                                        for fig in self.current_figures:
-                                            pdf.savefig(fig, bbox_inches='tight')
+                                        for fig in self.get_current_figures():
+                                            with MATPLOTLIB_LOCK:
+                                                pdf.savefig(fig, bbox_inches='tight')
                                 else:
                                     # 对于图片格式，只保存第一个图表
-                                    self.current_figures[0].savefig(file_path, dpi=300, bbox_inches='tight')
+                                    self.save_chart(0, file_path)
                                     
                             except Exception as e:
                                 messagebox.showerror("错误", f"导出图表失败: {str(e)}")
@@ -1204,29 +4115,10 @@ class StudentGradeAnalysisSystem:
                     
                     if file_path:
                         try:
-                            self.current_figures[0].savefig(file_path, dpi=300, bbox_inches='tight')
+                            self.save_chart(0, file_path)
                         except Exception as e:
                             messagebox.showerror("错误", f"导出图表失败: {str(e)}")
                             return
-            elif var_chart.get() and hasattr(self, 'current_fig'):
-                # 兼容旧版本的单图表导出
-                file_path = filedialog.asksaveasfilename(
-                    defaultextension=".png",
-                    initialfile=default_filename,
-                    filetypes=[
-                        ("PNG files", "*.png"),
-                        ("JPEG files", "*.jpg"),
-                        ("PDF files", "*.pdf"),
-                        ("All files", "*.*")
-                    ]
-                )
-                
-                if file_path:
-                    try:
-                        self.current_fig.savefig(file_path, dpi=300, bbox_inches='tight')
-                    except Exception as e:
-                        messagebox.showerror("错误", f"导出图表失败: {str(e)}")
-                        return
         
             messagebox.showinfo("成功", "分析结果导出成功")
             export_window.destroy()
@@ -1241,6 +4133,7 @@ class StudentGradeAnalysisSystem:
         from reportlab.pdfbase.ttfonts import TTFont
         from reportlab.lib.pagesizes import letter
         from reportlab.pdfgen import canvas
+        from reportlab.lib.utils import ImageReader
         from matplotlib.backends.backend_agg import FigureCanvasAgg
         import os
         import tempfile
@@ -1312,53 +4205,54 @@ class StudentGradeAnalysisSystem:
             pdf.drawString(30, height - 30, "学生成绩分析报告")
 
             # 添加统计数据
+            report = self.get_stats_report()
             y_position = height - 60
             set_pdf_font(pdf, 12)
             pdf.drawString(30, y_position, "===== 基本统计信息 =====")
             y_position -= 20
-            pdf.drawString(30, y_position, f"总记录数: {len(self.data)}")
+            pdf.drawString(30, y_position, f"总记录数: {report.record_count}")
 
-            if "姓名" in self.data.columns:
+            if report.student_count is not None:
                 y_position -= 20
-                pdf.drawString(30, y_position, f"学生人数: {self.data['姓名'].nunique()}")
+                pdf.drawString(30, y_position, f"学生人数: {report.student_count}")
 
             y_position -= 40
             pdf.drawString(30, y_position, "===== 各科目详细统计 =====")
             y_position -= 20
 
-            for subject in self.analysis_results["subject_columns"]:
+            for subject, row in report.table.iterrows():
                 if y_position < 50:
                     pdf.showPage()
                     y_position = height - 30
 
                 pdf.drawString(30, y_position, f"{subject}:")
                 y_position -= 20
-                pdf.drawString(50, y_position, f"平均分: {self.data[subject].mean():.2f}")
+                pdf.drawString(50, y_position, f"平均分: {row['平均分']:.2f}")
                 y_position -= 20
-                pdf.drawString(50, y_position, f"中位数: {self.data[subject].median():.2f}")
+                pdf.drawString(50, y_position, f"中位数: {row['中位数']:.2f}")
                 y_position -= 20
-                pdf.drawString(50, y_position, f"标准差: {self.data[subject].std():.2f}")
+                pdf.drawString(50, y_position, f"标准差: {row['标准差']:.2f}")
                 y_position -= 20
 
             # 添加更多统计内容
-            if "总分" in self.data.columns:
+            if report.total is not None:
                 y_position -= 20
                 pdf.drawString(30, y_position, "===== 总分统计 =====")
                 y_position -= 20
-                pdf.drawString(50, y_position, f"平均分: {self.data['总分'].mean():.2f}")
+                pdf.drawString(50, y_position, f"平均分: {report.total['平均分']:.2f}")
                 y_position -= 20
-                pdf.drawString(50, y_position, f"最高分: {self.data['总分'].max()}")
+                pdf.drawString(50, y_position, f"最高分: {report.total['最大值']:g}")
                 y_position -= 20
-                pdf.drawString(50, y_position, f"最低分: {self.data['总分'].min()}")
+                pdf.drawString(50, y_position, f"最低分: {report.total['最小值']:g}")
                 y_position -= 20
-                pdf.drawString(50, y_position, f"标准差: {self.data['总分'].std():.2f}")
+                pdf.drawString(50, y_position, f"标准差: {report.total['标准差']:.2f}")
                 y_position -= 30
                 
+            if report.top_students is not None:
                 # 添加排名前10的学生
                 pdf.drawString(30, y_position, "===== 排名前10的学生 =====")
                 y_position -= 20
-                top_students = self.data.sort_values("总分", ascending=False).head(10)
-                for idx, (_, student) in enumerate(top_students.iterrows()):
+                for idx, (_, student) in enumerate(report.top_students.iterrows()):
                     if y_position < 50:
                         pdf.showPage()
                         y_position = height - 30
@@ -1394,8 +4288,8 @@ class StudentGradeAnalysisSystem:
                     y_position -= 20
 
             # 添加所有图表
-            if hasattr(self, 'current_figures'):
-                for i, fig in enumerate(self.current_figures):
+            if self.chart_view is not None:
+                for i in range(self.current_chart_count()):
                     # 检查是否需要新页面
                     if y_position < 350:
                         pdf.showPage()
@@ -1403,7 +4297,9 @@ class StudentGradeAnalysisSystem:
 
                     # 添加图表标题
                     set_pdf_font(pdf, 14, bold=True)
-                    if i == 0 and "总分" in self.data.columns:
+                    if getattr(self, 'current_analysis_type', None) == 'class':
+                        chart_title = f"{self.CLASS_CHARTS[i][0]}图"
+                    elif i == 0 and "总分" in self.data.columns:
                         chart_title = "总分分布分析图"
                     elif hasattr(self, 'current_analysis_type'):
                         if self.current_analysis_type == 'subject':
@@ -1414,8 +4310,7 @@ class StudentGradeAnalysisSystem:
                             else:
                                 chart_title = f"科目对比图表 {i+1}"
                         else:  # distribution analysis
-                            subject_columns = [col for col in self.data.columns 
-                                             if col not in ["序号", "学号", "姓名", "班级", "总分", "排名"]]
+                            subject_columns = self.get_schema().subjects
                             subject_idx = i - (1 if "总分" in self.data.columns else 0)
                             if subject_idx < len(subject_columns):
                                 subject_name = subject_columns[subject_idx]
@@ -1428,27 +4323,33 @@ class StudentGradeAnalysisSystem:
                     pdf.drawString(30, y_position, chart_title)
                     y_position -= 30
 
-                    # 将图表保存为图像（使用唯一文件名）
-                    import tempfile
-                    import os
-                    
-                    # 创建临时文件
-                    temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-                    temp_file.close()
-                    img_path = temp_file.name
-                    
-                    try:
-                        # 保存图表
-                        fig.savefig(img_path, format="png", dpi=150, bbox_inches='tight')
+                    # 在PDF中插入图像（150 DPI，数据不变时直接使用渲染缓存）
+                    image = ImageReader(io.BytesIO(self.chart_view.chart_png(i, 150)))
+                    pdf.drawImage(image, 30, y_position - 280, width=500, height=280)
+                    y_position -= 320
 
-                        # 在PDF中插入图像
-                        pdf.drawImage(img_path, 30, y_position - 280, width=500, height=280)
-                        y_position -= 320
-                        
-                    finally:
-                        # 清理临时文件
-                        if os.path.exists(img_path):
-                            os.unlink(img_path)
+            # 添加各班级统计页面（每个班级单独一页）
+            cube = self.get_class_cube()
+            if cube is not None:
+                for label in cube.labels:
+                    pdf.showPage()
+                    y_position = height - 30
+                    class_table = cube.class_table(label)
+                    set_pdf_font(pdf, 14, bold=True)
+                    pdf.drawString(30, y_position, f"===== 班级: {label}（{int(class_table['人数'].max())}人） =====")
+                    y_position -= 30
+                    set_pdf_font(pdf, 12)
+                    for subject, row in class_table.iterrows():
+                        if y_position < 50:
+                            pdf.showPage()
+                            y_position = height - 30
+                            set_pdf_font(pdf, 12)
+                        pdf.drawString(50, y_position, 
+                                       f"{subject}: 平均分 {row['平均分']:.2f}  中位数 {row['中位数']:.2f}  "
+                                       f"及格率 {row['及格率']:.2f}%  优秀率 {row['优秀率']:.2f}%")
+                        y_position -= 20
+                pdf.showPage()
+                y_position = height - 30
 
             # 添加分析结论
             if y_position < 150:
@@ -1460,23 +4361,19 @@ class StudentGradeAnalysisSystem:
             y_position -= 30
             set_pdf_font(pdf, 12)
             
-            # 计算整体表现
-            subject_columns = self.analysis_results["subject_columns"]
-            overall_avg = sum(self.data[subject].mean() for subject in subject_columns) / len(subject_columns)
-            pdf.drawString(50, y_position, f"1. 各科目平均分为: {overall_avg:.2f}")
+            # 整体表现
+            pdf.drawString(50, y_position, f"1. 各科目平均分为: {report.overall_mean:.2f}")
             y_position -= 20
             
-            # 找出表现最好和最差的科目
-            best_subject = max(subject_columns, key=lambda x: self.data[x].mean())
-            worst_subject = min(subject_columns, key=lambda x: self.data[x].mean())
-            pdf.drawString(50, y_position, f"2. 表现最好的科目: {best_subject} ({self.data[best_subject].mean():.2f})")
+            # 表现最好和最差的科目
+            best_subject, worst_subject = report.best_subject, report.worst_subject
+            pdf.drawString(50, y_position, f"2. 表现最好的科目: {best_subject} ({report.table.loc[best_subject, '平均分']:.2f})")
             y_position -= 20
-            pdf.drawString(50, y_position, f"3. 需要改进的科目: {worst_subject} ({self.data[worst_subject].mean():.2f})")
+            pdf.drawString(50, y_position, f"3. 需要改进的科目: {worst_subject} ({report.table.loc[worst_subject, '平均分']:.2f})")
             y_position -= 20
             
             # 整体及格率
-            overall_pass_rate = sum((self.data[subject] >= 60).sum() for subject in subject_columns) / (len(subject_columns) * len(self.data)) * 100
-            pdf.drawString(50, y_position, f"4. 整体及格率: {overall_pass_rate:.2f}%")
+            pdf.drawString(50, y_position, f"4. 整体及格率: {report.overall_pass_rate:.2f}%")
             y_position -= 30
             
             # 添加生成时间
@@ -1519,23 +4416,29 @@ class StudentGradeAnalysisSystem:
 
 1. 数据导入
    - 点击菜单栏的"文件" -> "导入数据"
-   - 支持导入Excel(.xlsx, .xls)和CSV(.csv)格式的文件
+   - 支持导入Excel(.xlsx, .xls)、CSV(.csv)和Parquet(.parquet)格式的文件
+   - 导入在后台分块进行，进度窗口显示已读取行数和速度，可随时取消
    - 数据应包含学生信息（如姓名、学号等）和各科目成绩
+   - 内存放不下的大文件可使用"文件" -> "大文件分块统计"，分块读取并直接给出基本统计结果
 
 2. 数据生成
    - 点击菜单栏的"工具" -> "学生数据生成器"
    - 可以自定义生成学生数量、学号前缀、班级范围
    - 可以选择科目和设置分数范围、及格分、及格率
-   - 生成的数据可以直接导出为Excel或CSV文件
+   - 生成的数据可以直接导出为Excel或CSV文件，也可以点击"追加到分析数据"追加到当前数据末尾
 
 3. 基本操作
    - 导入数据后，系统会在左侧表格显示数据
+   - 双击表格中的科目成绩可以修改成绩，总分、平均分、排名和班级排名随之更新
+   - 点击菜单栏的"工具" -> "百分位查询"，输入科目（或总分）和分数，查看百分位和所在分数段
    - 可以使用底部的按钮进行各种分析
 
 4. 分析功能
    - 基本统计分析：计算各科目平均分、最高分、最低分、及格率等
    - 科目对比分析：生成各科目平均分对比图和分数分布箱线图
    - 成绩分布分析：生成总分分布直方图和分数段占比饼图
+   - 班级分析：查看单个班级的各科目统计，生成各班级平均分和及格率对比图
+   - 状态栏右侧显示当前保留的图表数量和估计内存，超过上限时自动释放最久未显示的图表
 
 5. 结果导出
    - 点击"导出分析结果"按钮
@@ -1559,17 +4462,15 @@ class StudentGradeAnalysisSystem:
         # 确保中文字体设置
         if os.path.exists("SimSun.ttf"):
             font_prop = fm.FontProperties(fname="SimSun.ttf")
-            plt.rcParams["font.family"] = font_prop.get_name()
+            with MATPLOTLIB_LOCK:
+                plt.rcParams["font.family"] = font_prop.get_name()
         
         # 清空可视化面板
         for widget in self.visual_frame.winfo_children():
             widget.destroy()
         
         # 识别科目列
-        subject_columns = []
-        for col in self.data.columns:
-            if col not in ["序号", "学号", "姓名", "班级", "总分", "排名"]:
-                subject_columns.append(col)
+        subject_columns = self.get_schema().subjects
         
         if not subject_columns:
             messagebox.showwarning("警告", "未识别到科目列")
@@ -1594,114 +4495,104 @@ class StudentGradeAnalysisSystem:
         scrollbar_h.pack(side=tk.BOTTOM, fill=tk.X)
         scrollbar_v.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 存储所有图表以便导出
-        self.current_figures = []
         self.current_analysis_type = 'advanced'  # 标记分析类型
+        charts = []
         
         # 1. 科目相关性热力图
         corr_frame = ttk.LabelFrame(scrollable_frame, text="科目间相关性分析", padding="10")
         corr_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        fig1, ax1 = plt.subplots(1, 1, figsize=(12, 8))
-        
-        # 计算相关性矩阵
-        correlation_matrix = self.data[subject_columns].corr()
+        # 计算相关性矩阵（来自缓存的协矩）
+        comoments = self.get_comoments()
+        correlation_matrix = comoments.correlation().loc[subject_columns, subject_columns]
         
-        # 创建热力图
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0,
-                   square=True, ax=ax1, fmt='.2f', cbar_kws={'shrink': .8})
-        ax1.set_title('科目间相关性热力图', fontsize=14, fontweight='bold')
-        plt.tight_layout()
-        
-        canvas1 = FigureCanvasTkAgg(fig1, master=corr_frame)
-        canvas1.draw()
-        canvas1.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        def build_correlation_chart(fig1):
+            ax1 = fig1.subplots()
+            
+            # 创建热力图；科目很多时不标注数值，避免文字重叠
+            sns.heatmap(correlation_matrix, annot=len(subject_columns) <= 20, cmap='coolwarm', center=0,
+                       square=True, ax=ax1, fmt='.2f', cbar_kws={'shrink': .8})
+            ax1.set_title('科目间相关性热力图', fontsize=14, fontweight='bold')
+            fig1.tight_layout()
         
-        self.current_figures.append(fig1)
+        charts.append((corr_frame, (12, 8), build_correlation_chart))
         
         # 2. 班级成绩对比分析（如果有班级信息）
         if "班级" in self.data.columns:
             class_frame = ttk.LabelFrame(scrollable_frame, text="班级成绩对比分析", padding="10")
             class_frame.pack(fill=tk.X, padx=10, pady=5)
             
-            fig2, ax2 = plt.subplots(1, 1, figsize=(12, 6))
-            
             # 计算各班级平均分
-            class_avg = self.data.groupby("班级")[subject_columns].mean()
-            
-            # 创建堆叠柱状图
-            class_avg.plot(kind='bar', ax=ax2, width=0.8)
-            ax2.set_title('各班级各科目平均分对比', fontsize=14, fontweight='bold')
-            ax2.set_ylabel('平均分')
-            ax2.set_xlabel('班级')
-            ax2.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
+            class_avg = self.get_class_cube().metric("平均分")
             
-            canvas2 = FigureCanvasTkAgg(fig2, master=class_frame)
-            canvas2.draw()
-            canvas2.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            def build_class_chart(fig2):
+                ax2 = fig2.subplots()
+                
+                # 创建堆叠柱状图
+                class_avg.plot(kind='bar', ax=ax2, width=0.8)
+                ax2.set_title('各班级各科目平均分对比', fontsize=14, fontweight='bold')
+                ax2.set_ylabel('平均分')
+                ax2.set_xlabel('班级')
+                ax2.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+                ax2.tick_params(axis='x', labelrotation=45)
+                fig2.tight_layout()
             
-            self.current_figures.append(fig2)
+            charts.append((class_frame, (12, 6), build_class_chart))
         
         # 3. 成绩分布密度图
         density_frame = ttk.LabelFrame(scrollable_frame, text="成绩分布密度分析", padding="10")
         density_frame.pack(fill=tk.X, padx=10, pady=5)
+        subject_bins = {subject: self.get_score_bins(subject) for subject in subject_columns}
         
-        fig3, ax3 = plt.subplots(1, 1, figsize=(12, 6))
-        
-        # 为每个科目绘制密度曲线
-        colors = plt.cm.Set3(range(len(subject_columns)))
-        for i, subject in enumerate(subject_columns):
-            sns.kdeplot(data=self.data, x=subject, ax=ax3, color=colors[i], label=subject)
-        
-        ax3.set_title('各科目成绩分布密度图', fontsize=14, fontweight='bold')
-        ax3.set_xlabel('分数')
-        ax3.set_ylabel('密度')
-        ax3.legend()
-        ax3.grid(True, alpha=0.3)
-        plt.tight_layout()
-        
-        canvas3 = FigureCanvasTkAgg(fig3, master=density_frame)
-        canvas3.draw()
-        canvas3.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        def build_density_chart(fig3):
+            ax3 = fig3.subplots()
+            
+            # 为每个科目绘制密度曲线
+            colors = plt.cm.Set3(range(len(subject_columns)))
+            for i, subject in enumerate(subject_columns):
+                x, y = subject_bins[subject].density()
+                ax3.plot(x, y, color=colors[i], label=subject)
+            
+            ax3.set_title('各科目成绩分布密度图', fontsize=14, fontweight='bold')
+            ax3.set_xlabel('分数')
+            ax3.set_ylabel('密度')
+            ax3.legend()
+            ax3.grid(True, alpha=0.3)
+            fig3.tight_layout()
         
-        self.current_figures.append(fig3)
+        charts.append((density_frame, (12, 6), build_density_chart))
         
         # 4. 学生成绩雷达图（前5名学生）
         if "总分" in self.data.columns:
             radar_frame = ttk.LabelFrame(scrollable_frame, text="优秀学生成绩雷达图", padding="10")
             radar_frame.pack(fill=tk.X, padx=10, pady=5)
             
-            fig4, ax4 = plt.subplots(1, 1, figsize=(10, 10), subplot_kw=dict(projection='polar'))
-            
             # 获取前5名学生
-            top5_students = self.data.nlargest(5, "总分")
-            
-            # 设置雷达图的角度
-            angles = np.linspace(0, 2 * np.pi, len(subject_columns), endpoint=False)
-            angles = np.concatenate((angles, [angles[0]]))  # 闭合图形
-            
-            colors_radar = plt.cm.Set1(range(5))
+            top5_students = self.data.iloc[top_k_positions(self.data["总分"], 5)]
             
-            for i, (_, student) in enumerate(top5_students.iterrows()):
-                values = [student[subject] for subject in subject_columns]
-                values += [values[0]]  # 闭合图形
+            def build_radar_chart(fig4):
+                ax4 = fig4.subplots(subplot_kw=dict(projection='polar'))
                 
-                ax4.plot(angles, values, 'o-', linewidth=2, label=f"{student['姓名']}", color=colors_radar[i])
-                ax4.fill(angles, values, alpha=0.1, color=colors_radar[i])
-            
-            ax4.set_xticks(angles[:-1])
-            ax4.set_xticklabels(subject_columns)
-            ax4.set_title('前5名学生各科目成绩雷达图', fontsize=14, fontweight='bold', pad=20)
-            ax4.legend(loc='upper right', bbox_to_anchor=(1.2, 1.0))
-            plt.tight_layout()
-            
-            canvas4 = FigureCanvasTkAgg(fig4, master=radar_frame)
-            canvas4.draw()
-            canvas4.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+                # 设置雷达图的角度
+                angles = np.linspace(0, 2 * np.pi, len(subject_columns), endpoint=False)
+                angles = np.concatenate((angles, [angles[0]]))  # 闭合图形
+                
+                colors_radar = plt.cm.Set1(range(5))
+                
+                for i, (_, student) in enumerate(top5_students.iterrows()):
+                    values = [student[subject] for subject in subject_columns]
+                    values += [values[0]]  # 闭合图形
+                    
+                    ax4.plot(angles, values, 'o-', linewidth=2, label=f"{student['姓名']}", color=colors_radar[i])
+                    ax4.fill(angles, values, alpha=0.1, color=colors_radar[i])
+                
+                ax4.set_xticks(angles[:-1])
+                ax4.set_xticklabels(subject_columns)
+                ax4.set_title('前5名学生各科目成绩雷达图', fontsize=14, fontweight='bold', pad=20)
+                ax4.legend(loc='upper right', bbox_to_anchor=(1.2, 1.0))
+                fig4.tight_layout()
             
-            self.current_figures.append(fig4)
+            charts.append((radar_frame, (10, 10), build_radar_chart))
         
         # 5. 成绩趋势分析（散点图矩阵）
         scatter_frame = ttk.LabelFrame(scrollable_frame, text="科目间成绩散点图矩阵", padding="10")
@@ -1711,38 +4602,52 @@ class StudentGradeAnalysisSystem:
         main_subjects = subject_columns[:4] if len(subject_columns) > 4 else subject_columns
         
         if len(main_subjects) > 1:
-            fig5, axes = plt.subplots(len(main_subjects), len(main_subjects), figsize=(12, 12))
+            # 数据量大时逐点绘制太慢，图片也过大，改为二维直方图；所需数据都在界面线程中准备好
+            use_density = len(self.data) > SCATTER_MATRIX_ROWS
+            if use_density:
+                cells = {(x, y): self.get_pair_histogram(x, y) 
+                         for x in main_subjects for y in main_subjects if x != y}
+            else:
+                cells = {subject: self.data[subject].to_numpy(dtype=np.float64, na_value=np.nan, copy=True) 
+                         for subject in main_subjects}
             
-            for i, subject1 in enumerate(main_subjects):
-                for j, subject2 in enumerate(main_subjects):
-                    ax = axes[i, j] if len(main_subjects) > 1 else axes
-                    
-                    if i == j:
-                        # 对角线显示直方图
-                        ax.hist(self.data[subject1], bins=15, alpha=0.7, color='skyblue')
-                        ax.set_title(f'{subject1} 分布')
-                    else:
-                        # 非对角线显示散点图
-                        ax.scatter(self.data[subject2], self.data[subject1], alpha=0.6, s=20)
+            def build_scatter_chart(fig5):
+                axes = fig5.subplots(len(main_subjects), len(main_subjects))
+                
+                for i, subject1 in enumerate(main_subjects):
+                    for j, subject2 in enumerate(main_subjects):
+                        ax = axes[i, j] if len(main_subjects) > 1 else axes
                         
-                        # 添加趋势线
-                        z = np.polyfit(self.data[subject2], self.data[subject1], 1)
-                        p = np.poly1d(z)
-                        ax.plot(self.data[subject2], p(self.data[subject2]), "r--", alpha=0.8)
-                    
-                    if j == 0:
-                        ax.set_ylabel(subject1)
-                    if i == len(main_subjects) - 1:
-                        ax.set_xlabel(subject2)
-            
-            plt.suptitle('主要科目间成绩关系散点图矩阵', fontsize=14, fontweight='bold')
-            plt.tight_layout()
-            
-            canvas5 = FigureCanvasTkAgg(fig5, master=scatter_frame)
-            canvas5.draw()
-            canvas5.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+                        if i == j:
+                            # 对角线显示直方图
+                            plot_binned_histogram(ax, subject_bins[subject1], 15, 'skyblue', kde=False, alpha=0.7)
+                            ax.set_title(f'{subject1} 分布')
+                        else:
+                            # 非对角线显示散点图，数据量大时显示二维直方图
+                            if use_density:
+                                counts, x_edges, y_edges = cells[(subject2, subject1)]
+                                ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts, 0), cmap='Blues')
+                            else:
+                                ax.scatter(cells[subject2], cells[subject1], alpha=0.6, s=20)
+                            
+                            # 添加趋势线（斜率和截距来自缓存的协矩）
+                            slope, intercept = comoments.trend_line(subject2, subject1)
+                            if not np.isnan(slope):
+                                x_range = subject_bins[subject2].points[[0, -1]]
+                                ax.plot(x_range, slope * x_range + intercept, "r--", alpha=0.8)
+                        
+                        if j == 0:
+                            ax.set_ylabel(subject1)
+                        if i == len(main_subjects) - 1:
+                            ax.set_xlabel(subject2)
+                
+                fig5.suptitle('主要科目间成绩关系散点图矩阵', fontsize=14, fontweight='bold')
+                fig5.tight_layout()
             
-            self.current_figures.append(fig5)
+            charts.append((scatter_frame, (12, 12), build_scatter_chart))
+        
+        # 滚动到可见范围附近的图表才在后台线程中构造并渲染
+        self.start_chart_render(main_canvas, charts)
         
         # 绑定鼠标滚轮事件
         def _on_mousewheel(event):
@@ -1750,14 +4655,135 @@ class StudentGradeAnalysisSystem:
         
         main_canvas.bind_all("<MouseWheel>", _on_mousewheel)
         
-        # 保存第一个图表供导出（为了兼容性）
-        if self.current_figures:
-            self.current_fig = self.current_figures[0]
-        
         # 切换到可视化选项卡
         self.notebook.select(self.visual_frame)
 
-if __name__ == "__main__":
+def build_arg_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description="基于Python的简易学生成绩分析系统，不带参数运行时启动图形界面")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    # 批量生成数据子命令
+    generate_parser = subparsers.add_parser("generate", help="批量生成学生成绩数据并写入CSV/Parquet文件")
+    generate_parser.add_argument("-n", "--students", type=int, required=True, help="学生数量")
+    generate_parser.add_argument("-o", "--output", required=True, help="输出文件路径（.csv 或 .parquet）")
+    generate_parser.add_argument("--seed", type=int, default=None, help="随机种子，相同种子生成完全相同的文件")
+    generate_parser.add_argument("--subjects", nargs="+", metavar="科目", help="要生成的科目，默认生成全部科目")
+    generate_parser.add_argument("--id-prefix", default="2023", help="学号前缀（默认 2023）")
+    generate_parser.add_argument("--class", dest="class_range", default="随机分配",
+                                 choices=["随机分配"] + CLASSES, help="班级范围（默认随机分配）")
+    generate_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                                 help=f"每块生成的学生人数（默认 {DEFAULT_CHUNK_SIZE}）")
+    generate_parser.add_argument("--format", choices=["csv", "parquet"], help="输出格式，默认根据扩展名判断")
+    correlation_group = generate_parser.add_mutually_exclusive_group()
+    correlation_group.add_argument("--correlation", type=float,
+                                   help="各科目间统一的相关系数，指定后所有科目从多元正态分布中联合生成")
+    correlation_group.add_argument("--correlation-file", metavar="CSV",
+                                   help="相关系数矩阵文件（逗号分隔，按所选科目顺序排列）")
+    generate_parser.add_argument("-j", "--workers", type=int, default=1,
+                                 help="并行进程数（默认 1）；大于1时 Parquet 输出为分片目录")
+    
+    # 分块统计子命令
+    stats_parser = subparsers.add_parser("stats", help="分块读取CSV/Parquet/Excel文件并输出基本统计结果，不把整个文件载入内存")
+    stats_parser.add_argument("input", help="数据文件路径")
+    stats_parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE,
+                              help=f"每次读取的行数（默认 {IMPORT_CHUNK_SIZE}）")
+    stats_parser.add_argument("-o", "--output", help="同时把各科目统计表保存为 .xlsx 或 .csv 文件")
+    return parser
+
+
+def run_generate_command(args, parser):
+    """执行 generate 子命令"""
+    if args.students <= 0:
+        parser.error("学生数量必须大于0")
+    if args.chunk_size <= 0:
+        parser.error("块大小必须大于0")
+    if args.workers <= 0:
+        parser.error("并行进程数必须大于0")
+    
+    subjects_by_name = {subject["name"]: subject for subject in SUBJECTS}
+    if args.subjects:
+        unknown = [name for name in args.subjects if name not in subjects_by_name]
+        if unknown:
+            parser.error(f"未知科目: {', '.join(unknown)}")
+        selected_subjects = [subjects_by_name[name] for name in args.subjects]
+    else:
+        selected_subjects = SUBJECTS
+    
+    correlation = args.correlation
+    if args.correlation_file:
+        try:
+            correlation = np.loadtxt(args.correlation_file, delimiter=",", ndmin=2)
+        except (OSError, ValueError) as e:
+            parser.error(f"读取相关系数矩阵失败: {e}")
+    try:
+        engine = StudentDataEngine(selected_subjects, args.id_prefix, args.class_range, seed=args.seed,
+                                   correlation=correlation)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    def report_progress(written, total):
+        print(f"已生成 {written}/{total} 条记录", file=sys.stderr)
+    
+    try:
+        write_dataset(engine, args.students, args.output, args.chunk_size, args.format,
+                      progress=report_progress, workers=args.workers)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"生成数据失败: {e}", file=sys.stderr)
+        return 1
+    print(f"数据已写入: {args.output}", file=sys.stderr)
+    return 0
+
+
+def run_stats_command(args, parser):
+    """执行 stats 子命令"""
+    if args.chunk_size <= 0:
+        parser.error("块大小必须大于0")
+    
+    def report_progress(rows, fraction):
+        print(f"已统计 {rows} 条记录（{fraction:.0%}）", file=sys.stderr)
+    
+    try:
+        report = stream_file_stats(args.input, args.chunk_size, progress=report_progress)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"统计数据失败: {e}", file=sys.stderr)
+        return 1
+    print(format_stats_report(report))
+    
+    if args.output:
+        stats_df = report.table
+        if report.total is not None:
+            stats_df = pd.concat([stats_df, report.total.to_frame().T]).rename_axis("科目")
+        try:
+            if args.output.lower().endswith(".csv"):
+                stats_df.to_csv(args.output, encoding="utf-8-sig")
+            else:
+                with pd.ExcelWriter(args.output) as writer:
+                    stats_df.to_excel(writer, sheet_name='统计数据')
+                    if report.top_students is not None:
+                        report.top_students.to_excel(writer, sheet_name='前十名学生', index=False)
+        except (OSError, ValueError) as e:
+            print(f"保存统计结果失败: {e}", file=sys.stderr)
+            return 1
+        print(f"统计结果已保存: {args.output}", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    """程序入口：带子命令时以命令行方式运行，否则启动图形界面"""
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    
+    if args.command == "generate":
+        return run_generate_command(args, parser)
+    if args.command == "stats":
+        return run_stats_command(args, parser)
+    
     root = tk.Tk()
     app = StudentGradeAnalysisSystem(root)
     root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())